@@ -1,6 +1,9 @@
+from .animation import Animation
 from .base_controller import Controller
-import mido
-import time
+from .gridstate import GridState
+from .widgets import Meter
+from .encoder import LEDEncoder
+from .events import Button, Control
 
 from . import errors
 
@@ -173,18 +176,66 @@ class APCMini(Controller):
 
     ShiftButtonMapping = [98]
 
-    def __init__(self, midi_in=None, midi_out=None):
-        super().__init__(midi_in, midi_out)
+    ProductID = 40  # Product byte of the Device Enquiry reply
+
+    # Prebuilt LED messages for every button with an LED
+    Encoder = LEDEncoder(sum(GridMapping, []) + SideButtonMapping + LowerButtonMapping)
+
+    def __init__(self, midi_in=None, midi_out=None, **kwargs):
+        super().__init__(midi_in, midi_out, **kwargs)
         self.name = "Akai APC Mini"  # Name of the device
         self.gridbuttons = APCMini.GridButtons(self)
         self.sidebuttons = APCMini.SideButtons(self)
         self.lowerbuttons = APCMini.LowerButtons(self)
 
+    def on_grid(self, x=None, y=None):
+        """Decorator for a handler of grid buttons, optionally only one column, row or button"""
+        return self.on_control(APCMini.GridButton, x=x, y=y)
+
+    def on_side(self, button_id=None):
+        """Decorator for a handler of the side buttons, optionally only one of them"""
+        return self.on_control(APCMini.SideButton, button_id=button_id)
+
+    def on_lower(self, button_id=None):
+        """Decorator for a handler of the lower buttons, optionally only one of them"""
+        return self.on_control(APCMini.LowerButton, button_id=button_id)
+
+    def on_shift(self):
+        """Decorator for a handler of the shift button"""
+        return self.on_control(APCMini.ShiftButton)
+
+    def on_fader(self, fader_id=None):
+        """Decorator for a handler of the faders, optionally only one of them"""
+        return self.on_control(APCMini.Fader, fader_id=fader_id)
+
     def reset(self):
-        """Turns off all LEDs"""
-        for i in range(0, 89 + 1):
-            self.midi_out.send(mido.Message("note_on", note=i, velocity=0))
-            time.sleep(0.005)
+        """Turns off all LEDs in the background, returns a future that is done once all are off"""
+        return self.send_leds(((i, 0, 0) for i in range(0, 89 + 1)), force=True)
+
+    def animate(self, render, fps=30):
+        """Starts an animation on the button grid, render(frame, tick) draws each frame into frame.colours"""
+        animation = Animation(self, render, fps)
+        animation.start()
+        return animation
+
+    def grid_state(self):
+        """Returns a NumPy backed GridState for drawing on the button grid, requires NumPy"""
+        return GridState(self, APCMini.GridMapping, 6, APCMini.GridColours)
+
+    def meter(self, columns, colour="green", off_colour="off", peak_colour=None, peak_hold=0.5, decay=8.0):
+        """Returns a level Meter that shows 0-127 values on the given grid columns, a list of their x"""
+        if not columns:
+            raise InvalidGridButton(self, self.midi_in, (len(columns), 0))
+        for x in columns:
+            if not 0 <= x < len(APCMini.GridMapping):
+                raise InvalidGridButton(self, self.midi_in, (x, 0))
+        states = []
+        for state_colour in (colour, off_colour, peak_colour):
+            velocity = APCMini.GridColours.get(state_colour, state_colour)
+            if state_colour is not None and (not isinstance(velocity, int) or not 0 <= velocity <= 6):
+                raise InvalidButtonColour(self, self.midi_in, APCMini.GridButton(self, columns[0], 0))
+            states.append(None if state_colour is None else (velocity, 0))
+        return Meter(self, [APCMini.GridMapping[x] for x in columns], *states, peak_hold, decay)
 
     def product_detect(self, event):
         try:
@@ -192,73 +243,46 @@ class APCMini(Controller):
                 raise errors.ControllerIdentificationError(self, self.midi_in, "Controller did not identify!")
 
             if event.data[4] != 71:
-                raise errors.ControllerIdentificationError("MIDI device is not an Akai device!")
+                raise errors.ControllerIdentificationError(self, self.midi_in, "MIDI device is not an Akai device!")
 
-            if event.data[5] != 40:
-                raise errors.ControllerIdentificationError("MIDI device is not an Akai APC Mini")
+            if event.data[5] != self.ProductID:
+                raise errors.ControllerIdentificationError(self, self.midi_in, "MIDI device is not an Akai APC Mini")
         except (AttributeError, IndexError):
             raise errors.ControllerIdentificationError(self, self.midi_in, "MIDI device failed to identify")
         self.setup_in_progress = False
         return True
 
-    def pre_event_dispatch(self, event):
-        if self.event_dispatch is None:
-            return  # Ignore if a dispatch event is not set with the on_event decorator
-
-        if event.type == "control_change":  # Event is a fader change
-            fader = APCMini.Fader(self, APCMini.Fader.get_fader_id_from_number(event.control), event.value)
-            self.event_dispatch(fader)
-
-        elif event.type == "note_on" or event.type == "note_off":  # Event is a button press
-            if event.note in range(0, 63 + 1):  # Button grid
-                if event.type == 'note_on':
-                    button = APCMini.GridButton(self, *APCMini.GridButton.get_xy_from_button_num(event.note), True)
-                    self.event_dispatch(button)
-
-                elif event.type == 'note_off':
-                    button = APCMini.GridButton(self, *APCMini.GridButton.get_xy_from_button_num(event.note), False)
-                    self.event_dispatch(button)
-
-            elif event.note in APCMini.SideButtonMapping:  # Side buttons
-                if event.type == 'note_on':
-                    button = APCMini.SideButton(self, APCMini.SideButton.get_button_id_from_button_num(event.note),
-                                                True)
-                    self.event_dispatch(button)
-
-                elif event.type == 'note_off':
-                    button = APCMini.SideButton(self, APCMini.SideButton.get_button_id_from_button_num(event.note),
-                                                False)
-                    self.event_dispatch(button)
-
-            elif event.note in APCMini.LowerButtonMapping:  # Lower buttons
-                if event.type == 'note_on':
-                    button = APCMini.LowerButton(self, APCMini.LowerButton.get_button_id_from_button_num(event.note),
-                                                 True)
-                    self.event_dispatch(button)
-
-                elif event.type == 'note_off':
-                    button = APCMini.LowerButton(self, APCMini.LowerButton.get_button_id_from_button_num(event.note),
-                                                 False)
-                    self.event_dispatch(button)
-
-            elif event.note in APCMini.ShiftButtonMapping:
-                if event.type == 'note_on':
-                    button = APCMini.ShiftButton(self, True)
-                    self.event_dispatch(button)
-
-                elif event.type == 'note_off':
-                    button = APCMini.ShiftButton(self, False)
-                    self.event_dispatch(button)
-
     class GridButtons:  # All the grid buttons
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, x, y, colour):
+        def set_led(self, x, y, colour, force=False):
             """Sets an LED on the button grid"""
-            APCMini.GridButton(self.controller, x, y).set_led(colour)
+            APCMini.GridButton(self.controller, x, y).set_led(colour, force)
+
+        def set_frame(self, frame, force=False):
+            """Sets all LEDs on the button grid from an 8x8 frame of colours indexed [x][y], only changed LEDs are sent"""
+            if len(frame) != len(APCMini.GridMapping):
+                raise InvalidGridButton(self.controller, self.controller.midi_in, (len(frame), 0))
+            velocities = []
+            for x, column in enumerate(frame):  # Validate the whole frame before anything is sent
+                if len(column) != len(APCMini.GridMapping[x]):
+                    raise InvalidGridButton(self.controller, self.controller.midi_in, (x, len(column)))
+                for y, colour in enumerate(column):
+                    if not isinstance(colour, int):
+                        colour = APCMini.GridColours.get(colour)
+                    if colour is None or not 0 <= colour <= 6:
+                        raise InvalidButtonColour(self.controller, self.controller.midi_in,
+                                                  APCMini.GridButton(self.controller, x, y))
+                    velocities.append((APCMini.GridMapping[x][y], colour))
+            sent = 0
+            for note, velocity in velocities:
+                sent += self.controller.send_led(note, velocity, force=force)
+            return sent  # Number of messages that were put on the wire
+
+    class GridButton(Button):  # A specific grid button
+        __slots__ = ("controller", "x", "y", "state")
 
-    class GridButton:  # A specific grid button
         def __init__(self, controller, x: int, y: int, state: bool = False):
             self.controller = controller
             self.x = x
@@ -267,21 +291,17 @@ class APCMini(Controller):
 
         @staticmethod
         def get_xy_from_button_num(button_num):
-            for column in APCMini.GridMapping:
-                x = APCMini.GridMapping.index(column)
-                if button_num in column:
-                    return x, APCMini.GridMapping[x].index(button_num)
-                else:
-                    continue
-            raise InvalidGridButton(None, None, button_num)
+            xy = Controller.decode_ids(APCMini.NoteDecode, button_num, APCMini.GridButton)
+            if xy is None:
+                raise InvalidGridButton(None, None, button_num)
+            return xy
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if isinstance(colour, int):
                 if 0 <= colour <= 6:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message("note_on", note=APCMini.GridMapping[self.x][self.y], velocity=colour))
+                        self.controller.send_led(APCMini.GridMapping[self.x][self.y], colour, force=force)
                     except IndexError:
                         raise InvalidGridButton(self.controller, self.controller.midi_in, (self.x, self.y))
                 else:
@@ -289,14 +309,16 @@ class APCMini(Controller):
             else:
                 if colour in APCMini.GridColours:
                     try:
-                        self.controller.midi_out.send(mido.Message("note_on", note=APCMini.GridMapping[self.x][self.y],
-                                                                   velocity=APCMini.GridColours[colour]))
+                        self.controller.send_led(APCMini.GridMapping[self.x][self.y], APCMini.GridColours[colour],
+                                                 force=force)
                     except IndexError:
                         raise InvalidGridButton(self.controller, self.controller.midi_in, (self.x, self.y))
                 else:
                     raise InvalidButtonColour(self.controller, self.controller.midi_in, self)
 
-    class Fader:  # A single fader
+    class Fader(Control):  # A single fader
+        __slots__ = ("controller", "fader_id", "value")
+
         def __init__(self, controller, fader_id, value):
             self.controller = controller
             self.fader_id = fader_id
@@ -304,20 +326,22 @@ class APCMini(Controller):
 
         @staticmethod
         def get_fader_id_from_number(fader_num):
-            try:
-                return APCMini.FaderMapping.index(fader_num)
-            except IndexError:
+            ids = Controller.decode_ids(APCMini.ControlDecode, fader_num, APCMini.Fader)
+            if ids is None:
                 raise InvalidFader(None, None, fader_num)
+            return ids[0]
 
     class SideButtons:  # All the side buttons
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the side buttons"""
-            APCMini.SideButton(self.controller, button_id).set_led(colour)
+            APCMini.SideButton(self.controller, button_id).set_led(colour, force)
+
+    class SideButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
 
-    class SideButton:  # A specific side button
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -325,15 +349,17 @@ class APCMini(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            return APCMini.SideButtonMapping.index(button_num)
+            ids = Controller.decode_ids(APCMini.NoteDecode, button_num, APCMini.SideButton)
+            if ids is None:
+                raise InvalidSideButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if isinstance(colour, int):
                 if 0 <= colour <= 6:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message("note_on", note=APCMini.SideButtonMapping[self.button_id], velocity=colour))
+                        self.controller.send_led(APCMini.SideButtonMapping[self.button_id], colour, force=force)
                     except IndexError:
                         raise InvalidSideButton(self.controller, self.controller.midi_in, self.button_id)
                 else:
@@ -341,9 +367,8 @@ class APCMini(Controller):
             else:
                 if colour in APCMini.SideButtonColours:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message("note_on", note=APCMini.SideButtonMapping[self.button_id],
-                                         velocity=APCMini.SideButtonColours[colour]))
+                        self.controller.send_led(APCMini.SideButtonMapping[self.button_id],
+                                                 APCMini.SideButtonColours[colour], force=force)
                     except IndexError:
                         raise InvalidLowerButton(self.controller, self.controller.midi_in, self.button_id)
                 else:
@@ -353,11 +378,13 @@ class APCMini(Controller):
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the lower buttons"""
-            APCMini.LowerButton(self.controller, button_id).set_led(colour)
+            APCMini.LowerButton(self.controller, button_id).set_led(colour, force)
+
+    class LowerButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
 
-    class LowerButton:  # A specific side button
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -365,18 +392,17 @@ class APCMini(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            try:
-                return APCMini.LowerButtonMapping.index(button_num)
-            except IndexError:
+            ids = Controller.decode_ids(APCMini.NoteDecode, button_num, APCMini.LowerButton)
+            if ids is None:
                 raise InvalidLowerButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if isinstance(colour, int):
                 if 0 <= colour <= 6:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message("note_on", note=APCMini.LowerButtonMapping[self.button_id], velocity=colour))
+                        self.controller.send_led(APCMini.LowerButtonMapping[self.button_id], colour, force=force)
                     except IndexError:
                         raise InvalidLowerButton(self.controller, self.controller.midi_in, self.button_id)
                 else:
@@ -384,15 +410,27 @@ class APCMini(Controller):
             else:
                 if colour in APCMini.LowerButtonColours:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message("note_on", note=APCMini.LowerButtonMapping[self.button_id],
-                                         velocity=APCMini.LowerButtonColours[colour]))
+                        self.controller.send_led(APCMini.LowerButtonMapping[self.button_id],
+                                                 APCMini.LowerButtonColours[colour], force=force)
                     except IndexError:
                         raise InvalidLowerButton(self.controller, self.controller.midi_in, self.button_id)
                 else:
                     raise InvalidButtonColour(self.controller, self.controller.midi_in, self)
 
-    class ShiftButton:  # The shift button
+    class ShiftButton(Button):  # The shift button
+        __slots__ = ("controller", "state")
+
         def __init__(self, controller, state: bool = False):
             self.controller = controller
             self.state = state
+
+
+# Decode tables for incoming messages, (number, control class, ids)
+APCMini.build_decode_tables(
+    notes=[(note, APCMini.GridButton, (x, y))
+           for x, column in enumerate(APCMini.GridMapping) for y, note in enumerate(column)]
+    + [(note, APCMini.SideButton, (button_id,)) for button_id, note in enumerate(APCMini.SideButtonMapping)]
+    + [(note, APCMini.LowerButton, (button_id,)) for button_id, note in enumerate(APCMini.LowerButtonMapping)]
+    + [(note, APCMini.ShiftButton, ()) for note in APCMini.ShiftButtonMapping],
+    controls=[(control, APCMini.Fader, (fader_id,)) for fader_id, control in enumerate(APCMini.FaderMapping)]
+)
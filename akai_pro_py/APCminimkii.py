@@ -1,6 +1,9 @@
+from .animation import Animation
 from .base_controller import Controller
-import mido
-import time
+from .gridstate import GridState
+from .widgets import Meter
+from .encoder import LEDEncoder
+from .events import Button, Control
 
 from . import errors
 
@@ -167,6 +170,27 @@ class InvalidButtonEffect(errors.ControllerError):
             return "Generic invalid button colour error"
 
 
+class InvalidRGBColour(errors.ControllerError):
+    def __init__(self, *args):
+        if args:
+            self.controller = args[0]
+            self.midi_port = args[1]
+            self.colour = args[2]
+        else:
+            self.controller = None
+            self.midi_port = None
+            self.colour = None
+
+    def __str__(self):
+        if self.colour is not None:
+            return f"Invalid RGB colour {self.colour!r}, valid options " \
+                    "are 0x000000-0xFFFFFF or (red, green, blue) with " \
+                    "values 0-255"
+
+        else:
+            return "Generic invalid RGB colour error"
+
+
 class APCMinimkii(Controller):
     GridMapping = [
         [0, 8, 16, 24, 32, 40, 48, 56],
@@ -247,23 +271,171 @@ class APCMinimkii(Controller):
 
     ShiftButtonMapping = [122]
 
-    def __init__(self, midi_in=None, midi_out=None):
-        super().__init__(midi_in, midi_out)
+    ProductID = 79  # Product byte of the Device Enquiry reply
+
+    # Prebuilt LED messages for every button with an LED
+    Encoder = LEDEncoder(
+        sum(GridMapping, []) + SideButtonMapping + LowerButtonMapping
+    )
+
+    # SysEx header to set the RGB colour of ranges of grid buttons
+    RGBSysExHeader = [0xF0, 0x47, 0x7F, 0x4F, 0x24]
+    # Ranges (of 8 data bytes each) packed into a single SysEx message
+    RGBSysExMaxRanges = 64
+
+    def __init__(self, midi_in=None, midi_out=None, **kwargs):
+        super().__init__(midi_in, midi_out, **kwargs)
         self.name = "Akai APC Mini MK 2"  # Name of the device
+        # Shadow of the RGB colours set on the grid, note -> (r, g, b)
+        self.rgb_state = {}
         self.gridbuttons = APCMinimkii.GridButtons(self)
         self.sidebuttons = APCMinimkii.SideButtons(self)
         self.lowerbuttons = APCMinimkii.LowerButtons(self)
 
+    def on_grid(self, x=None, y=None):
+        """Decorator for a handler of grid buttons
+
+        Optionally only for one column, row or button.
+        """
+        return self.on_control(APCMinimkii.GridButton, x=x, y=y)
+
+    def on_side(self, button_id=None):
+        """Decorator for a handler of the side buttons, optionally only one"""
+        return self.on_control(APCMinimkii.SideButton, button_id=button_id)
+
+    def on_lower(self, button_id=None):
+        """Decorator for a handler of the lower buttons, optionally only one"""
+        return self.on_control(APCMinimkii.LowerButton, button_id=button_id)
+
+    def on_shift(self):
+        """Decorator for a handler of the shift button"""
+        return self.on_control(APCMinimkii.ShiftButton)
+
+    def on_fader(self, fader_id=None):
+        """Decorator for a handler of the faders, optionally only one"""
+        return self.on_control(APCMinimkii.Fader, fader_id=fader_id)
+
     def reset(self, fast=False):
-        """Turns off all LEDs"""
+        """Turns off all LEDs in the background
+
+        Returns a future that is done once all LEDs are off. With fast the
+        messages are not paced by the output scheduler.
+        """
         # Build range
         all_leds = [int(x) for x in range(64)]
         all_leds += APCMinimkii.SideButtonMapping
         all_leds += APCMinimkii.LowerButtonMapping
-        for i in all_leds:
-            self.midi_out.send(mido.Message("note_on", note=i, velocity=0))
-            if not fast:
-                time.sleep(0.005)
+        return self.send_leds(
+            ((i, 0, 0) for i in all_leds), force=True, paced=not fast
+        )
+
+    def animate(self, render, fps=30):
+        """Starts an animation on the button grid
+
+        render(frame, tick) draws each frame into frame.colours and
+        frame.effects, which start as the previous frame.
+        """
+        animation = Animation(
+            self, render, fps, effect=APCMinimkii.GridEffects["bright"]
+        )
+        animation.start()
+        return animation
+
+    def grid_state(self):
+        """Returns a NumPy backed GridState for drawing on the button grid
+
+        Requires NumPy. Besides colours it has an effects array, which
+        starts at full brightness.
+        """
+        return GridState(
+            self, APCMinimkii.GridMapping, 127, APCMinimkii.GridColours,
+            max_effect=15, effect_names=APCMinimkii.GridEffects,
+            effect=APCMinimkii.GridEffects["bright"]
+        )
+
+    def meter(self, columns, colour="green", off_colour="off",
+              peak_colour=None, peak_hold=0.5, decay=8.0, effect="bright"):
+        """Returns a level Meter that shows 0-127 values on grid columns
+
+        columns is a list of the x of one or more grid columns.
+        """
+        if not columns:
+            raise InvalidGridButton(self, self.midi_in, (len(columns), 0))
+        for x in columns:
+            if not 0 <= x < len(APCMinimkii.GridMapping):
+                raise InvalidGridButton(self, self.midi_in, (x, 0))
+        button = APCMinimkii.GridButton(self, columns[0], 0)
+        channel = APCMinimkii.GridEffects.get(effect, effect)
+        if not isinstance(channel, int) or channel not in range(16):
+            raise InvalidButtonEffect(self, self.midi_in, button)
+        states = []
+        for state_colour in (colour, off_colour, peak_colour):
+            velocity = APCMinimkii.GridColours.get(state_colour, state_colour)
+            if state_colour is not None and (
+                    not isinstance(velocity, int) or velocity not in range(128)
+            ):
+                raise InvalidButtonColour(self, self.midi_in, button)
+            states.append(
+                None if state_colour is None else (velocity, channel)
+            )
+        return Meter(
+            self, [APCMinimkii.GridMapping[x] for x in columns], *states,
+            peak_hold, decay
+        )
+
+    def invalidate_leds(self):
+        """Forgets the shadow LED and RGB state"""
+        super().invalidate_leds()
+        self.rgb_state.clear()
+
+    def restore_leds(self):
+        """Sends the whole shadow LED and RGB state again"""
+        self.send_rgb([
+            (note, colour) for note, colour in list(self.rgb_state.items())
+            if note not in self.led_state
+        ], force=True)
+        return super().restore_leds()
+
+    def send_rgb(self, pads, force=False):
+        """Sets grid buttons given as (note, (r, g, b)) to RGB colours
+
+        Buttons already showing their colour are skipped, neighbouring
+        buttons with the same colour share one range and all ranges are
+        packed into as few SysEx messages as possible. Returns the number
+        of SysEx messages sent.
+        """
+        changed = {}
+        for note, colour in pads:
+            if not force and note not in self.led_state \
+                    and self.rgb_state.get(note) == colour:
+                continue
+            changed[note] = colour
+        ranges = []  # [start note, end note, colour]
+        for note in sorted(changed):
+            colour = changed[note]
+            if ranges and ranges[-1][1] == note - 1 \
+                    and ranges[-1][2] == colour:
+                ranges[-1][1] = note
+            else:
+                ranges.append([note, note, colour])
+        for offset in range(0, len(ranges), APCMinimkii.RGBSysExMaxRanges):
+            chunk = ranges[offset:offset + APCMinimkii.RGBSysExMaxRanges]
+            length = len(chunk) * 8
+            message = APCMinimkii.RGBSysExHeader + [length >> 7, length & 0x7F]
+            for start, end, (red, green, blue) in chunk:
+                message += [
+                    start, end,
+                    red >> 7, red & 0x7F,
+                    green >> 7, green & 0x7F,
+                    blue >> 7, blue & 0x7F
+                ]
+            message.append(0xF7)
+            self.send_raw(bytes(message))
+        for note, colour in changed.items():
+            self.rgb_state[note] = colour
+            # The note_on state is gone, the next set_led has to be sent
+            self.led_state.pop(note, None)
+        return -(-len(ranges) // APCMinimkii.RGBSysExMaxRanges)
 
     def product_detect(self, event):
         try:
@@ -274,12 +446,13 @@ class APCMinimkii(Controller):
 
             if event.data[4] != 71:
                 raise errors.ControllerIdentificationError(
-                    "MIDI device is not an Akai device!"
+                    self, self.midi_in, "MIDI device is not an Akai device!"
                 )
 
-            if event.data[5] != 79:
+            if event.data[5] != self.ProductID:
                 raise errors.ControllerIdentificationError(
-                    "MIDI device is not an Akai APC Mini"
+                    self, self.midi_in,
+                    "MIDI device is not an Akai APC Mini mk2"
                 )
         except (AttributeError, IndexError):
             raise errors.ControllerIdentificationError(
@@ -288,65 +461,79 @@ class APCMinimkii(Controller):
         self.setup_in_progress = False
         return True
 
-    def pre_event_dispatch(self, event):
-        if self.event_dispatch is None:
-            # Ignore if a dispatch event is not set with the on_event decorator
-            return
-
-        if event.type == "control_change":  # Event is a fader change
-            fader = APCMinimkii.Fader(
-                self,
-                APCMinimkii.Fader.get_fader_id_from_number(event.control),
-                event.value
-            )
-            self.event_dispatch(fader)
-
-        elif event.type == "note_on" or event.type == "note_off":
-            # Event is a button press
-            state = True
-            if event.note in range(64):  # Button grid
-                if event.type == 'note_off':
-                    state = False
-                button = APCMinimkii.GridButton(
-                    self,
-                    *APCMinimkii.GridButton.get_xy_from_button_num(event.note),
-                    state
-                )
-                self.event_dispatch(button)
-
-            elif event.note in APCMinimkii.SideButtonMapping:  # Side buttons
-                if event.type == 'note_off':
-                    state = False
-                button = APCMinimkii.SideButton(
-                    self,
-                    APCMinimkii.SideButton.get_button_id_from_button_num(event.note),  # noqa: E501
-                    state
-                )
-                self.event_dispatch(button)
-
-            elif event.note in APCMinimkii.LowerButtonMapping:  # Lower buttons
-                if event.type == 'note_off':
-                    state = False
-                button = APCMinimkii.LowerButton(
-                    self,
-                    APCMinimkii.LowerButton.get_button_id_from_button_num(event.note),  # noqa: E501
-                    state
-                )
-                self.event_dispatch(button)
-
-            elif event.note in APCMinimkii.ShiftButtonMapping:
-                if event.type == 'note_off':
-                    state = False
-                button = APCMinimkii.ShiftButton(self, state)
-                self.event_dispatch(button)
-
     class GridButtons:  # All the grid buttons
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, x, y, colour, effect):
+        def set_led(self, x, y, colour, effect, force=False):
             """Sets an LED on the button grid"""
-            APCMinimkii.GridButton(self.controller, x, y).set_led(colour, effect)  # noqa: E501
+            APCMinimkii.GridButton(self.controller, x, y).set_led(
+                colour, effect, force
+            )
+
+        def set_frame(self, frame, effects="bright", force=False):
+            """Sets all LEDs on the button grid from an 8x8 frame
+
+            frame is indexed [x][y] like set_led, effects is either one effect
+            for every button (full brightness by default) or an 8x8 frame of
+            effects. Only changed LEDs are sent.
+            """
+            if len(frame) != len(APCMinimkii.GridMapping):
+                raise InvalidGridButton(
+                    self.controller, self.controller.midi_in, (len(frame), 0)
+                )
+            if isinstance(effects, (list, tuple)):
+                if len(effects) != len(APCMinimkii.GridMapping):
+                    raise InvalidGridButton(
+                        self.controller, self.controller.midi_in,
+                        (len(effects), 0)
+                    )
+                effect = None
+            else:
+                effect = effects
+            leds = []
+            # Validate the whole frame before anything is sent
+            for x, column in enumerate(frame):
+                if effect is None:
+                    effect_column = effects[x]
+                    if len(effect_column) != len(column):
+                        raise InvalidGridButton(
+                            self.controller, self.controller.midi_in,
+                            (x, len(effect_column))
+                        )
+                if len(column) != len(APCMinimkii.GridMapping[x]):
+                    raise InvalidGridButton(
+                        self.controller, self.controller.midi_in,
+                        (x, len(column))
+                    )
+                for y, colour in enumerate(column):
+                    if not isinstance(colour, int):
+                        colour = APCMinimkii.GridColours.get(colour)
+                    if colour not in range(128):
+                        raise InvalidButtonColour(
+                            self.controller, self.controller.midi_in,
+                            APCMinimkii.GridButton(self.controller, x, y)
+                        )
+                    button_effect = effect_column[y] if effect is None \
+                        else effect
+                    if not isinstance(button_effect, int):
+                        button_effect = APCMinimkii.GridEffects.get(
+                            button_effect
+                        )
+                    if button_effect not in range(16):
+                        raise InvalidButtonEffect(
+                            self.controller, self.controller.midi_in,
+                            APCMinimkii.GridButton(self.controller, x, y)
+                        )
+                    leds.append(
+                        (APCMinimkii.GridMapping[x][y], colour, button_effect)
+                    )
+            sent = 0
+            for note, colour, button_effect in leds:
+                sent += self.controller.send_led(
+                    note, colour, channel=button_effect, force=force
+                )
+            return sent  # Number of messages that were put on the wire
 
         def reset_led(self, x, y):
             """ Turns of an LED on the button grid """
@@ -354,11 +541,53 @@ class APCMinimkii(Controller):
 
         def reset_all_leds(self):
             for button in range(64):
-                self.controller.midi_out.send(
-                    mido.Message("note_on", note=button, velocity=0)
-                )
+                self.controller.send_led(button, 0, force=True)
+
+        def set_rgb(self, x, y, colour, force=False):
+            """Sets an LED on the button grid to a 24 bit RGB colour"""
+            return self.set_rgb_frame([[colour]], x, y, force)
+
+        def set_rgb_frame(self, frame, x=0, y=0, force=False):
+            """Sets a rectangle of the button grid to 24 bit RGB colours
+
+            frame is indexed [x][y] like set_frame and is placed with its
+            first button at x, y. Colours are 0xRRGGBB or (r, g, b) with
+            values 0-255. Only changed buttons are sent, in as few SysEx
+            messages as possible.
+            """
+            pads = []
+            # Validate the whole frame before anything is sent
+            for frame_x, column in enumerate(frame):
+                for frame_y, colour in enumerate(column):
+                    button_x, button_y = x + frame_x, y + frame_y
+                    if not 0 <= button_x < len(APCMinimkii.GridMapping) \
+                            or not 0 <= button_y < len(
+                                APCMinimkii.GridMapping[button_x]):
+                        raise InvalidGridButton(
+                            self.controller, self.controller.midi_in,
+                            (button_x, button_y)
+                        )
+                    if isinstance(colour, int) and 0 <= colour <= 0xFFFFFF:
+                        colour = (
+                            colour >> 16, (colour >> 8) & 0xFF, colour & 0xFF
+                        )
+                    elif not isinstance(colour, (tuple, list)) \
+                            or len(colour) != 3 \
+                            or not all(
+                                isinstance(value, int) and 0 <= value <= 255
+                                for value in colour):
+                        raise InvalidRGBColour(
+                            self.controller, self.controller.midi_in, colour
+                        )
+                    pads.append((
+                        APCMinimkii.GridMapping[button_x][button_y],
+                        tuple(colour)
+                    ))
+            return self.controller.send_rgb(pads, force)
+
+    class GridButton(Button):  # A specific grid button
+        __slots__ = ("controller", "x", "y", "state")
 
-    class GridButton:  # A specific grid button
         def __init__(self, controller, x: int, y: int, state: bool = False):
             self.controller = controller
             self.x = x
@@ -367,15 +596,14 @@ class APCMinimkii(Controller):
 
         @staticmethod
         def get_xy_from_button_num(button_num):
-            for column in APCMinimkii.GridMapping:
-                x = APCMinimkii.GridMapping.index(column)
-                if button_num in column:
-                    return x, APCMinimkii.GridMapping[x].index(button_num)
-                else:
-                    continue
-            raise InvalidGridButton(None, None, button_num)
-
-        def set_led(self, colour, effect):
+            xy = Controller.decode_ids(
+                APCMinimkii.NoteDecode, button_num, APCMinimkii.GridButton
+            )
+            if xy is None:
+                raise InvalidGridButton(None, None, button_num)
+            return xy
+
+        def set_led(self, colour, effect, force=False):
             """Sets this specific button's LED to be the colour given"""
             if not isinstance(colour, int):
                 # if colour is given as string check APCMinimkii.GridColours
@@ -408,13 +636,11 @@ class APCMinimkii(Controller):
                     self.controller, self.controller.midi_in, self
                 )
             try:  # Try to set the led
-                self.controller.midi_out.send(
-                    mido.Message(
-                        "note_on",
-                        note=APCMinimkii.GridMapping[self.x][self.y],
-                        velocity=colour,
-                        channel=effect
-                    )
+                self.controller.send_led(
+                    APCMinimkii.GridMapping[self.x][self.y],
+                    colour,
+                    channel=effect,
+                    force=force
                 )
             except IndexError:
                 raise InvalidGridButton(
@@ -422,7 +648,9 @@ class APCMinimkii(Controller):
                     (self.x, self.y)
                 )
 
-    class Fader:  # A single fader
+    class Fader(Control):  # A single fader
+        __slots__ = ("controller", "fader_id", "value")
+
         def __init__(self, controller, fader_id, value):
             self.controller = controller
             self.fader_id = fader_id
@@ -430,18 +658,22 @@ class APCMinimkii(Controller):
 
         @staticmethod
         def get_fader_id_from_number(fader_num):
-            try:
-                return APCMinimkii.FaderMapping.index(fader_num)
-            except IndexError:
+            ids = Controller.decode_ids(
+                APCMinimkii.ControlDecode, fader_num, APCMinimkii.Fader
+            )
+            if ids is None:
                 raise InvalidFader(None, None, fader_num)
+            return ids[0]
 
     class SideButtons:  # All the side buttons
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the side buttons"""
-            APCMinimkii.SideButton(self.controller, button_id).set_led(colour)
+            APCMinimkii.SideButton(self.controller, button_id).set_led(
+                colour, force
+            )
 
         def reset_led(self, button_id):
             """Turns of an LED on the side buttons"""
@@ -452,7 +684,9 @@ class APCMinimkii(Controller):
             for button in range(len(APCMinimkii.SideButtonMapping)):
                 self.reset_led(button)
 
-    class SideButton:  # A specific side button
+    class SideButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
+
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -460,9 +694,14 @@ class APCMinimkii(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            return APCMinimkii.SideButtonMapping.index(button_num)
+            ids = Controller.decode_ids(
+                APCMinimkii.NoteDecode, button_num, APCMinimkii.SideButton
+            )
+            if ids is None:
+                raise InvalidSideButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if not isinstance(colour, int):
                 if colour not in APCMinimkii.SideButtonColours:
@@ -480,12 +719,10 @@ class APCMinimkii(Controller):
                     self
                 )
             try:  # Try to send the event
-                self.controller.midi_out.send(
-                    mido.Message(
-                        "note_on",
-                        note=APCMinimkii.SideButtonMapping[self.button_id],
-                        velocity=colour
-                    )
+                self.controller.send_led(
+                    APCMinimkii.SideButtonMapping[self.button_id],
+                    colour,
+                    force=force
                 )
             except IndexError:
                 raise InvalidSideButton(
@@ -498,9 +735,11 @@ class APCMinimkii(Controller):
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the lower buttons"""
-            APCMinimkii.LowerButton(self.controller, button_id).set_led(colour)
+            APCMinimkii.LowerButton(self.controller, button_id).set_led(
+                colour, force
+            )
 
         def reset_led(self, button_id):
             """Turns of an LED on the lower buttons"""
@@ -511,7 +750,9 @@ class APCMinimkii(Controller):
             for button in range(len(APCMinimkii.LowerButtonMapping)):
                 self.reset_led(button)
 
-    class LowerButton:  # A specific side button
+    class LowerButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
+
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -519,12 +760,14 @@ class APCMinimkii(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            try:
-                return APCMinimkii.LowerButtonMapping.index(button_num)
-            except IndexError:
+            ids = Controller.decode_ids(
+                APCMinimkii.NoteDecode, button_num, APCMinimkii.LowerButton
+            )
+            if ids is None:
                 raise InvalidLowerButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if not isinstance(colour, int):
                 if colour not in APCMinimkii.LowerButtonColours:
@@ -542,12 +785,10 @@ class APCMinimkii(Controller):
                     self
                 )
             try:
-                self.controller.midi_out.send(
-                    mido.Message(
-                        "note_on",
-                        note=APCMinimkii.LowerButtonMapping[self.button_id],  # noqa: E501
-                        velocity=colour
-                    )
+                self.controller.send_led(
+                    APCMinimkii.LowerButtonMapping[self.button_id],
+                    colour,
+                    force=force
                 )
             except IndexError:
                 raise InvalidLowerButton(
@@ -556,7 +797,32 @@ class APCMinimkii(Controller):
                     self.button_id
                 )
 
-    class ShiftButton:  # The shift button
+    class ShiftButton(Button):  # The shift button
+        __slots__ = ("controller", "state")
+
         def __init__(self, controller, state: bool = False):
             self.controller = controller
             self.state = state
+
+
+# Decode tables for incoming messages, (number, control class, ids)
+APCMinimkii.build_decode_tables(
+    notes=[
+        (note, APCMinimkii.GridButton, (x, y))
+        for x, column in enumerate(APCMinimkii.GridMapping)
+        for y, note in enumerate(column)
+    ] + [
+        (note, APCMinimkii.SideButton, (button_id,))
+        for button_id, note in enumerate(APCMinimkii.SideButtonMapping)
+    ] + [
+        (note, APCMinimkii.LowerButton, (button_id,))
+        for button_id, note in enumerate(APCMinimkii.LowerButtonMapping)
+    ] + [
+        (note, APCMinimkii.ShiftButton, ())
+        for note in APCMinimkii.ShiftButtonMapping
+    ],
+    controls=[
+        (control, APCMinimkii.Fader, (fader_id,))
+        for fader_id, control in enumerate(APCMinimkii.FaderMapping)
+    ]
+)
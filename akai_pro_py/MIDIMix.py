@@ -1,6 +1,6 @@
 from .base_controller import Controller
-import mido
-import time
+from .encoder import LEDEncoder
+from .events import Button, Control
 from . import errors
 
 
@@ -192,8 +192,13 @@ class MIDIMix(Controller):
 
     SoloMapping = [27]
 
-    def __init__(self, midi_in=None, midi_out=None):
-        super().__init__(midi_in, midi_out)
+    ProductID = 49  # Product byte of the Device Enquiry reply
+
+    # Prebuilt LED messages for every button with an LED
+    Encoder = LEDEncoder(MuteMapping + RecArmMapping + BankMapping)
+
+    def __init__(self, midi_in=None, midi_out=None, **kwargs):
+        super().__init__(midi_in, midi_out, **kwargs)
         self.name = "Akai MIDI Mix"  # Name of the device
         self.mutebuttons = MIDIMix.MuteButtons(self)
         self.recarmbuttons = MIDIMix.RecArmButtons(self)
@@ -213,7 +218,7 @@ class MIDIMix(Controller):
                     "MIDI device is not an Akai device!"
                 )
 
-            if event.data[5] != 49:
+            if event.data[5] != self.ProductID:
                 raise errors.ControllerIdentificationError(
                     self, self.midi_in,
                     "MIDI device is not an Akai MIDI Mix"
@@ -226,106 +231,56 @@ class MIDIMix(Controller):
         self.setup_in_progress = False
         return True
 
-    def pre_event_dispatch(self, event):
-        # Ignore if a dispatch event is not set with the on_event decorator
-        if self.event_dispatch is None:
-            return
-
-        if event.type == "control_change":  # Event is a fader or knob change
-            if event.control in MIDIMix.FaderMapping:
-                fader = MIDIMix.Fader(
-                    self,
-                    MIDIMix.Fader.get_fader_id_from_number(event.control),
-                    event.value
-                )
-                self.event_dispatch(fader)
-            elif event.control in MIDIMix.Knobs:
-                knob = MIDIMix.Knob(
-                    self,
-                    *MIDIMix.Knob.get_knob_xy_from_number(event.control),
-                    event.value
-                )
-                self.event_dispatch(knob)
-
-        elif event.type == "note_on" or event.type == "note_off":
-            if event.note in MIDIMix.RecArmMapping:
-                if event.type == "note_on":
-                    button = MIDIMix.RecArmButton(
-                        self,
-                        MIDIMix.RecArmButton.get_button_id_from_button_num(
-                            event.note
-                        ),
-                        True
-                    )
-                    self.event_dispatch(button)
-                elif event.type == "note_off":
-                    button = MIDIMix.RecArmButton(
-                        self,
-                        MIDIMix.RecArmButton.get_button_id_from_button_num(
-                            event.note
-                        ),
-                        False
-                    )
-                    self.event_dispatch(button)
-
-            elif event.note in MIDIMix.MuteMapping:
-                if event.type == "note_on":
-                    button = MIDIMix.MuteButton(
-                        self,
-                        MIDIMix.MuteButton.get_button_id_from_button_num(
-                            event.note
-                        ),
-                        True
-                    )
-                    self.event_dispatch(button)
-                elif event.type == "note_off":
-                    button = MIDIMix.MuteButton(
-                        self,
-                        MIDIMix.MuteButton.get_button_id_from_button_num(
-                            event.note
-                        ),
-                        False
-                    )
-                    self.event_dispatch(button)
-
-            elif event.note in MIDIMix.BankMapping:
-                if event.type == "note_on":
-                    button = MIDIMix.BankButton(
-                        self,
-                        MIDIMix.BankButton.get_button_id_from_button_num(
-                            event.note
-                        ),
-                        True
-                    )
-                    self.event_dispatch(button)
-                elif event.type == "note_off":
-                    button = MIDIMix.BankButton(
-                        self,
-                        MIDIMix.BankButton.get_button_id_from_button_num(
-                            event.note
-                        ),
-                        False
-                    )
-                    self.event_dispatch(button)
+    def on_knob(self, column=None, row=None):
+        """Decorator for a handler of the knobs
+
+        Optionally only for one column (x, 0-7), row (y, 0-2) or knob.
+        """
+        return self.on_control(MIDIMix.Knob, x=column, y=row)
+
+    def on_fader(self, fader_id=None):
+        """Decorator for a handler of the faders, optionally only one"""
+        return self.on_control(MIDIMix.Fader, fader_id=fader_id)
+
+    def on_mute(self, button_id=None):
+        """Decorator for a handler of the mute buttons, optionally only one"""
+        return self.on_control(MIDIMix.MuteButton, button_id=button_id)
 
-            elif event.note in MIDIMix.SoloMapping:
-                if event.type == "note_on":
-                    button = MIDIMix.SoloButton(self, True)
-                    self.event_dispatch(button)
-                elif event.type == "note_off":
-                    button = MIDIMix.SoloButton(self, False)
-                    self.event_dispatch(button)
+    def on_recarm(self, button_id=None):
+        """Decorator for a handler of the rec arm buttons
+
+        Optionally only for one of them.
+        """
+        return self.on_control(MIDIMix.RecArmButton, button_id=button_id)
+
+    def on_bank(self, button_id=None):
+        """Decorator for a handler of the bank buttons, optionally only one"""
+        return self.on_control(MIDIMix.BankButton, button_id=button_id)
+
+    def on_solo(self):
+        """Decorator for a handler of the solo button"""
+        return self.on_control(MIDIMix.SoloButton)
 
     def reset(self):
-        for ButtonGroup in [
-                MIDIMix.MuteMapping, MIDIMix.RecArmMapping, MIDIMix.BankMapping
-        ]:
-            for Button in ButtonGroup:
-                self.midi_out.send(
-                    mido.Message("note_on", note=Button, velocity=0))
-                time.sleep(0.005)
-
-    class Fader:
+        """Turns off all LEDs in the background
+
+        Returns a future that is done once all LEDs are off.
+        """
+        return self.send_leds(
+            (
+                (Button, 0, 0)
+                for ButtonGroup in [
+                    MIDIMix.MuteMapping, MIDIMix.RecArmMapping,
+                    MIDIMix.BankMapping
+                ]
+                for Button in ButtonGroup
+            ),
+            force=True
+        )
+
+    class Fader(Control):
+        __slots__ = ("controller", "fader_id", "value")
+
         def __init__(self, controller, fader_id, value):
             self.controller = controller
             self.fader_id = fader_id
@@ -333,12 +288,16 @@ class MIDIMix(Controller):
 
         @staticmethod
         def get_fader_id_from_number(fader_num):
-            try:
-                return MIDIMix.FaderMapping.index(fader_num)
-            except IndexError:
+            ids = Controller.decode_ids(
+                MIDIMix.ControlDecode, fader_num, MIDIMix.Fader
+            )
+            if ids is None:
                 raise InvalidFader(None, None, fader_num)
+            return ids[0]
+
+    class Knob(Control):
+        __slots__ = ("controller", "x", "y", "value")
 
-    class Knob:
         def __init__(self, controller, x, y, value):
             self.controller = controller
             self.x = x
@@ -347,23 +306,26 @@ class MIDIMix(Controller):
 
         @staticmethod
         def get_knob_xy_from_number(knob_num):
-            for column in MIDIMix.KnobGridMapping:
-                x = MIDIMix.KnobGridMapping.index(column)
-                if knob_num in column:
-                    return x, MIDIMix.KnobGridMapping[x].index(knob_num)
-                else:
-                    continue
-            raise InvalidKnob(None, None, knob_num)
+            xy = Controller.decode_ids(
+                MIDIMix.ControlDecode, knob_num, MIDIMix.Knob
+            )
+            if xy is None:
+                raise InvalidKnob(None, None, knob_num)
+            return xy
 
     class MuteButtons:  # All the lower buttons
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the lower buttons"""
-            MIDIMix.MuteButton(self.controller, button_id).set_led(colour)
+            MIDIMix.MuteButton(self.controller, button_id).set_led(
+                colour, force
+            )
+
+    class MuteButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
 
-    class MuteButton:  # A specific side button
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -371,22 +333,22 @@ class MIDIMix(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            try:
-                return MIDIMix.MuteMapping.index(button_num)
-            except IndexError:
+            ids = Controller.decode_ids(
+                MIDIMix.NoteDecode, button_num, MIDIMix.MuteButton
+            )
+            if ids is None:
                 raise InvalidMuteButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if isinstance(colour, int):
                 if 0 <= colour <= 1:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message(
-                                "note_on",
-                                note=MIDIMix.MuteMapping[self.button_id],
-                                velocity=colour
-                            )
+                        self.controller.send_led(
+                            MIDIMix.MuteMapping[self.button_id],
+                            colour,
+                            force=force
                         )
                     except IndexError:
                         raise InvalidMuteButton(
@@ -403,12 +365,10 @@ class MIDIMix(Controller):
             else:
                 if colour in MIDIMix.MuteColours:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message(
-                                "note_on",
-                                note=MIDIMix.MuteMapping[self.button_id],
-                                velocity=MIDIMix.MuteColours[colour]
-                            )
+                        self.controller.send_led(
+                            MIDIMix.MuteMapping[self.button_id],
+                            MIDIMix.MuteColours[colour],
+                            force=force
                         )
                     except IndexError:
                         raise InvalidMuteButton(
@@ -427,11 +387,15 @@ class MIDIMix(Controller):
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the lower buttons"""
-            MIDIMix.RecArmButton(self.controller, button_id).set_led(colour)
+            MIDIMix.RecArmButton(self.controller, button_id).set_led(
+                colour, force
+            )
+
+    class RecArmButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
 
-    class RecArmButton:  # A specific side button
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -439,22 +403,22 @@ class MIDIMix(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            try:
-                return MIDIMix.RecArmMapping.index(button_num)
-            except:  # noqa: E722
+            ids = Controller.decode_ids(
+                MIDIMix.NoteDecode, button_num, MIDIMix.RecArmButton
+            )
+            if ids is None:
                 raise InvalidRecArmButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if isinstance(colour, int):
                 if 0 <= colour <= 1:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message(
-                                "note_on",
-                                note=MIDIMix.RecArmMapping[self.button_id],
-                                velocity=colour
-                            )
+                        self.controller.send_led(
+                            MIDIMix.RecArmMapping[self.button_id],
+                            colour,
+                            force=force
                         )
                     except IndexError:
                         raise InvalidRecArmButton(
@@ -471,12 +435,10 @@ class MIDIMix(Controller):
             else:
                 if colour in MIDIMix.RecArmColours:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message(
-                                "note_on",
-                                note=MIDIMix.RecArmMapping[self.button_id],
-                                velocity=MIDIMix.RecArmColours[colour]
-                            )
+                        self.controller.send_led(
+                            MIDIMix.RecArmMapping[self.button_id],
+                            MIDIMix.RecArmColours[colour],
+                            force=force
                         )
                     except IndexError:
                         raise InvalidRecArmButton(
@@ -495,11 +457,15 @@ class MIDIMix(Controller):
         def __init__(self, controller):
             self.controller = controller
 
-        def set_led(self, button_id, colour):
+        def set_led(self, button_id, colour, force=False):
             """Sets an LED on the lower buttons"""
-            MIDIMix.BankButton(self.controller, button_id).set_led(colour)
+            MIDIMix.BankButton(self.controller, button_id).set_led(
+                colour, force
+            )
+
+    class BankButton(Button):  # A specific side button
+        __slots__ = ("controller", "button_id", "state")
 
-    class BankButton:  # A specific side button
         def __init__(self, controller, button_id: int, state: bool = False):
             self.controller = controller
             self.button_id = button_id
@@ -507,22 +473,22 @@ class MIDIMix(Controller):
 
         @staticmethod
         def get_button_id_from_button_num(button_num):
-            try:
-                return MIDIMix.BankMapping.index(button_num)
-            except IndexError:
+            ids = Controller.decode_ids(
+                MIDIMix.NoteDecode, button_num, MIDIMix.BankButton
+            )
+            if ids is None:
                 raise InvalidBankButton(None, None, button_num)
+            return ids[0]
 
-        def set_led(self, colour):
+        def set_led(self, colour, force=False):
             """Sets this specific button's LED to be the colour given"""
             if isinstance(colour, int):
                 if 0 <= colour <= 1:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message(
-                                "note_on",
-                                note=MIDIMix.BankMapping[self.button_id],
-                                velocity=colour
-                            )
+                        self.controller.send_led(
+                            MIDIMix.BankMapping[self.button_id],
+                            colour,
+                            force=force
                         )
                     except IndexError:
                         raise InvalidBankButton(
@@ -539,12 +505,10 @@ class MIDIMix(Controller):
             else:
                 if colour in MIDIMix.RecArmColours:
                     try:
-                        self.controller.midi_out.send(
-                            mido.Message(
-                                "note_on",
-                                note=MIDIMix.BankMapping[self.button_id],
-                                velocity=MIDIMix.BankColours[colour]
-                            )
+                        self.controller.send_led(
+                            MIDIMix.BankMapping[self.button_id],
+                            MIDIMix.BankColours[colour],
+                            force=force
                         )
                     except IndexError:
                         raise InvalidBankButton(
@@ -559,7 +523,34 @@ class MIDIMix(Controller):
                         self
                     )
 
-    class SoloButton:  # The shift button
+    class SoloButton(Button):  # The shift button
+        __slots__ = ("controller", "state")
+
         def __init__(self, controller, state: bool = False):
             self.controller = controller
             self.state = state
+
+
+# Decode tables for incoming messages, (number, control class, ids)
+MIDIMix.build_decode_tables(
+    notes=[
+        (note, MIDIMix.RecArmButton, (button_id,))
+        for button_id, note in enumerate(MIDIMix.RecArmMapping)
+    ] + [
+        (note, MIDIMix.MuteButton, (button_id,))
+        for button_id, note in enumerate(MIDIMix.MuteMapping)
+    ] + [
+        (note, MIDIMix.BankButton, (button_id,))
+        for button_id, note in enumerate(MIDIMix.BankMapping)
+    ] + [
+        (note, MIDIMix.SoloButton, ()) for note in MIDIMix.SoloMapping
+    ],
+    controls=[
+        (control, MIDIMix.Fader, (fader_id,))
+        for fader_id, control in enumerate(MIDIMix.FaderMapping)
+    ] + [
+        (control, MIDIMix.Knob, (x, y))
+        for x, column in enumerate(MIDIMix.KnobGridMapping)
+        for y, control in enumerate(column)
+    ]
+)
@@ -1,2 +1,12 @@
-from . import controllers
+import importlib
+
 from . import errors
+
+__all__ = ["controllers", "errors"]
+
+
+def __getattr__(name):
+    # controllers loads the device modules, it is imported on first use so importing the package stays fast
+    if name == "controllers":
+        return importlib.import_module(".controllers", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
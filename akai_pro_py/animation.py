@@ -0,0 +1,103 @@
+import threading
+import time
+
+
+class Frame:
+    """One frame of the button grid, colours (and effects) are indexed [x][y]"""
+
+    def __init__(self, colour=0, effect=None, width=8, height=8):
+        self.colours = [[colour] * height for _ in range(width)]
+        # Effects are only used on controllers that have them, e.g. the APC Mini MK 2
+        self.effects = None if effect is None else [[effect] * height for _ in range(width)]
+
+    def copy_from(self, other):
+        """Overwrites this frame with the contents of another frame"""
+        for column, source in zip(self.colours, other.colours):
+            column[:] = source
+        if self.effects is not None:
+            for column, source in zip(self.effects, other.effects):
+                column[:] = source
+
+
+class Animation:
+    """Renders frames for the button grid at a fixed rate on a background thread
+
+    Every tick render(frame, tick) draws into a back buffer that starts as a
+    copy of the last frame. The buffers are swapped and only the buttons that
+    changed are sent to the controller.
+    """
+
+    def __init__(self, controller, render, fps=30, effect=None):
+        self.controller = controller
+        self.render = render
+        self.fps = fps
+        self.front = Frame(effect=effect)  # Frame that is shown on the controller
+        self.back = Frame(effect=effect)  # Frame that is being rendered
+        self.frames = 0  # Frames rendered so far
+        self.missed_deadlines = 0  # Ticks that were skipped because a frame took too long
+        self.frame_time_total = 0.0  # Seconds spent rendering and sending frames
+        self.frame_time_max = 0.0
+        self.error = None  # Exception that stopped the animation
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts ticking on a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="akai_pro_py animation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the animation and waits for the current frame to finish"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        """Returns frame count, missed deadlines and frame times in seconds"""
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "missed_deadlines": self.missed_deadlines,
+            "frame_time_avg": self.frame_time_total / self.frames if self.frames else 0.0,
+            "frame_time_max": self.frame_time_max,
+            "frame_budget": 1 / self.fps
+        }
+
+    def tick(self):
+        """Renders, swaps and sends a single frame"""
+        self.back.copy_from(self.front)
+        self.render(self.back, self.frames)
+        self.front, self.back = self.back, self.front
+        if self.front.effects is None:
+            self.controller.gridbuttons.set_frame(self.front.colours)
+        else:
+            self.controller.gridbuttons.set_frame(self.front.colours, self.front.effects)
+        self.frames += 1
+
+    def _run(self):
+        period = 1 / self.fps
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.tick()
+            except Exception as error:  # Keep the error for the caller instead of dying silently
+                self.error = error
+                return
+            finished = time.monotonic()
+            frame_time = finished - started
+            self.frame_time_total += frame_time
+            self.frame_time_max = max(self.frame_time_max, frame_time)
+            deadline += period
+            if finished > deadline:  # Too slow, drop the ticks we can not make anymore
+                missed = int((finished - deadline) // period) + 1
+                self.missed_deadlines += missed
+                deadline += missed * period
+            self._stop.wait(deadline - finished)
@@ -1,55 +1,634 @@
-import mido
 import asyncio
+import collections
+import threading
+import traceback
+import types
+from concurrent.futures import Future
 
 from . import errors
+from .encoder import LEDEncoder
+from .eventqueue import EventQueue, HandlerPool, LoopDispatcher
+from .scheduler import OutputScheduler
+from .streams import EventStream
 
 
 class Controller:
-    def __init__(self, midi_in=None, midi_out=None):
-        self.midi_out = mido.open_output(midi_out)  # Open MIDI out for controller
-        self.midi_in = mido.open_input(midi_in)  # Open MIDI in for controller
-        self.setup_in_progress = True
-        self.midi_in.callback = self.on_midi_in  # Set callback function for incomming MIDI messages
+    DeviceEnquiry = [0xF0, 0x7E, 0x7F, 0x06, 0x01, 0xF7]  # MIDI Device Enquiry (SysEx)
+    ProductID = None  # Product byte of the Device Enquiry reply, set by every device
+    Encoder = LEDEncoder()  # Prebuilt LED messages, devices build theirs from their mappings
+    NoteDecode = [None] * 128  # note -> (control class, ids) for note_on and note_off
+    ControlDecode = [None] * 128  # control -> (control class, ids) for control_change
+
+    def __init__(self, midi_in=None, midi_out=None, output_rate=200, coalesce_output=False, raw_input=False,
+                 coalesce_input=False, handler_workers=0, loop=None, async_dispatch=False, input_capacity=None,
+                 input_overflow="drop_oldest", identify=True, identify_timeout=1.0, identify_retries=2,
+                 early_input=256, port_cache=None, port_factory=None):
+        # Opens ports by name, mido (the default) or anything with its open_input/open_output/get_*_names, e.g.
+        # loopback.LoopbackBackend
+        self.port_factory = port_factory
+        # Open MIDI out for controller, or use a port that is already open
+        self.midi_out = self.open_port("output", midi_out)
+        self.write = self.raw_writer(self.midi_out)  # Writes raw MIDI bytes to the output port
+        self.output = OutputScheduler(self.write, output_rate)  # Paces bulk LED updates in the background
+        # Queue every LED update, only the latest per LED is sent, output.coalesced counts the merged updates
+        self.coalesce_output = coalesce_output
+        self.midi_in = self.open_port("input", midi_in)
+        self.setup_in_progress = identify  # Without identify the ports are known to be this device (see discover)
         self.event_dispatch = None  # Defines the dispatch event to be none
         self.ready_dispatch = None
         self.raw_dispatch = False
-        self.loop = asyncio.new_event_loop()  # Creates the event loop for handling button presses
+        # The event loop for handling button presses, pass a loop to share it with other asyncio code
+        self._loop = loop
         self.name = "Base Controller"  # Name of the device
-        self.midi_out.send(mido.Message.from_bytes([0xF0, 0x7E, 0x7F, 0x06, 0x01, 0xF7]))  # MIDI Device Enquiry (SysEx)
+        self.led_state = {}  # Shadow of the LEDs on the device, note -> (velocity, channel)
+        self.button_events = ([None] * 128, [None] * 128)  # Reused button events, [state][note]
+        self.subscriptions = []  # (control class, {id name: value}, func) registered with on_control
+        self.note_handlers = [()] * 128  # note -> every function that handles that button
+        self.control_handlers = [()] * 128  # control -> every function that handles that fader or knob
+        # Run the handler on its own thread, faders and knobs only keep their latest value while it is busy
+        # With an input_capacity at most that many events wait for the handler, see EventQueue for input_overflow
+        queue_options = {"coalesce": coalesce_input, "capacity": input_capacity, "overflow": input_overflow}
+        if handler_workers:  # Run handlers on a pool of threads, each control stays in order
+            self.input_queue = HandlerPool(self.deliver, handler_workers, **queue_options)
+        elif async_dispatch:  # Run handlers on the thread running the event loop
+            if input_capacity is not None:
+                raise errors.AkaiProPyError("input_capacity needs a handler thread, it can not be used with async_dispatch")
+            self.input_queue = LoopDispatcher(self.loop, self.deliver, coalesce_input)
+        elif coalesce_input or input_capacity is not None:
+            self.input_queue = EventQueue(self.deliver, **queue_options)
+        else:
+            self.input_queue = None
+        # Identification: ready is a future that is done with the controller once the device answered the Device
+        # Enquiry, or fails with ControllerIdentificationError. Each try waits identify_timeout seconds. ready is
+        # replaced by a new future whenever the device is identified again (a late answer, a cached identity that
+        # was not confirmed, a hot-plug reconnect), so look it up on the controller instead of keeping it.
+        self.ready = Future()
+        self.identify_timeout = identify_timeout
+        self.identify_retries = identify_retries
+        self.early_input = collections.deque(maxlen=early_input)  # Input before identification, replayed after it
+        self._identify_lock = threading.Lock()
+        self._identify_timer = None
+        self._identify_tries = 0
+        self.identity = None  # Data bytes of the device's Device Enquiry reply
+        # With a PortCache (True for the default file) a device found in it is ready at once, confirmed is then a
+        # future that is done once the device confirmed it in the background
+        if port_cache is True:
+            from .portcache import PortCache
+            port_cache = PortCache()
+        self.port_cache = port_cache
+        self.confirmed = None
+        if not identify:
+            self.ready.set_result(self)
+        self.connected = True  # False while the device is unplugged, see HotplugMonitor
+        self.restore_on_ready = False  # Restore the LEDs once the device identified, set by reconnect()
+        self.raw_input = raw_input  # Decode the backend's raw bytes instead of mido messages
+        self.listen(self.midi_in)
+        if identify:
+            cached = port_cache.get(self.midi_in.name, self.midi_out.name) if port_cache is not None else None
+            if cached is not None and cached["product"] == self.ProductID:
+                self.start_confirmation(cached["identity"])
+            else:
+                self.start_identification()
+
+    @staticmethod
+    def get_port_factory(port_factory=None):
+        """Returns port_factory, or mido when it is None"""
+        if port_factory is not None:
+            return port_factory
+        import mido  # Imported on first use, mido and its backend are most of a short script's startup
+        return mido
+
+    def open_port(self, kind, port):
+        """Opens an "input" or "output" port by name, ports that are already open are used as they are"""
+        if port is not None and not isinstance(port, str):
+            return port
+        factory = self.get_port_factory(self.port_factory)
+        return factory.open_input(port) if kind == "input" else factory.open_output(port)
+
+    def listen(self, port):
+        """Sets the callback for incomming MIDI messages of an input port"""
+        if self.raw_input:
+            self.listen_raw(port)
+        else:
+            port.callback = self.on_midi_in
+
+    def disconnect(self):
+        """Closes the ports after the device went away
+
+        Until reconnect() LED updates only change the shadow LED state, which
+        reconnect() restores on the device. An identification that is still
+        running fails, reconnect() starts a new one.
+        """
+        self.connected = False
+        self.set_writer(lambda data: None)
+        with self._identify_lock:
+            if self._identify_timer is not None:
+                self._identify_timer.cancel()
+            if not self.ready.done():
+                self.setup_in_progress = True
+                self.ready.set_exception(errors.ControllerIdentificationError(
+                    self, self.midi_in, "The device was unplugged during identification"))
+        for port in (self.midi_in, self.midi_out):
+            try:
+                port.close()
+            except Exception:  # The device is gone, the backend may fail to close it cleanly
+                pass
+
+    def reconnect(self, midi_in, midi_out):
+        """Opens the ports of a device that came back, identifies it and then restores its LEDs
+
+        Returns the ready future of the identification, the LEDs are queued
+        in one paced burst just before it is done.
+        """
+        midi_out = self.open_port("output", midi_out)
+        try:
+            midi_in = self.open_port("input", midi_in)
+        except Exception:
+            midi_out.close()
+            raise
+        self.midi_out = midi_out
+        self.midi_in = midi_in
+        self.set_writer(self.raw_writer(midi_out))
+        self.listen(midi_in)
+        self.connected = True
+        self.restore_on_ready = True  # Also when the device only answers after identification timed out
+        return self.start_identification()
+
+    def set_writer(self, write):
+        self.write = write
+        self.output.write = write
+
+    def restore_leds(self):
+        """Sends the whole shadow LED state again, paced, returns a future like send_leds"""
+        leds = [(note, velocity, channel) for note, (velocity, channel) in list(self.led_state.items())]
+        return self.send_leds(leds, force=True)
+
+    def monitor(self, interval=1.0):
+        """Starts a HotplugMonitor that reconnects the controller when it was unplugged and comes back"""
+        from .hotplug import HotplugMonitor
+        return HotplugMonitor([self], interval).start()
+
+    @property
+    def loop(self):
+        """The event loop for handling button presses, created on first use"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    @loop.setter
+    def loop(self, loop):
+        self._loop = loop
+
+    def send_led(self, note, velocity, channel=0, force=False):
+        """Sends an LED update, unless the LED already shows that state"""
+        state = (velocity, channel)
+        if not force and self.led_state.get(note) == state:
+            return False  # Nothing changed, keep the message off the wire
+        if self.coalesce_output:
+            self.output.send(self.Encoder.encode(note, velocity, channel), key=note)
+        else:
+            self.send_raw(self.Encoder.encode(note, velocity, channel))
+        self.led_state[note] = state
+        return True
+
+    def send_leds(self, leds, force=False, paced=True):
+        """Queues LED updates given as (note, velocity, channel) on the output scheduler
+
+        Returns immediately with a future that is done once all changed LEDs were sent.
+        """
+        messages = []
+        notes = []
+        for note, velocity, channel in leds:
+            state = (velocity, channel)
+            if not force and self.led_state.get(note) == state:
+                continue
+            messages.append(self.Encoder.encode(note, velocity, channel))
+            notes.append(note)
+            self.led_state[note] = state
+        return self.output.send_many(messages, paced, notes if self.coalesce_output else None)
+
+    async def send_leds_async(self, leds, force=False, paced=True):
+        """Same as send_leds, returns once all changed LEDs were sent"""
+        return await asyncio.wrap_future(self.send_leds(leds, force, paced))
+
+    def send_raw(self, data):
+        """Sends a raw MIDI message, keeping it behind anything still queued on the output scheduler"""
+        if self.output.pending:
+            self.output.send(data, paced=False)
+        else:
+            self.write(data)
+
+    @staticmethod
+    def raw_writer(port):
+        """Returns a function that writes raw MIDI bytes to a mido output port"""
+        rtmidi_out = getattr(port, "_rt", None)
+        if rtmidi_out is not None:  # The rtmidi backend takes the bytes as they are
+            send_message = rtmidi_out.send_message
+            # rtmidi is not thread-safe and the scheduler, handlers and animations all write, so hold the lock
+            # mido's send() takes (also around the Device Enquiry)
+            send_lock = getattr(port, "_send_lock", None) or threading.RLock()
+
+            def write(data):
+                with send_lock:
+                    send_message(data)
+            return write
+        send_bytes = getattr(port, "send_bytes", None)
+        if send_bytes is not None:  # Ports that are not mido's can take the bytes too, e.g. the loopback backend
+            return send_bytes
+        import mido
+        return lambda data: port.send(mido.Message.from_bytes(data))
+
+    def wait_output(self, timeout=None):
+        """Blocks until all queued output was sent, returns False on timeout"""
+        return self.output.join(timeout)
+
+    def invalidate_leds(self):
+        """Forgets the shadow LED state, e.g. after the device was reconnected"""
+        self.led_state.clear()
 
     def on_event(self, func):
         """Used to dispatch MIDI events from the controller"""
         if self.event_dispatch is not None:
             raise errors.AkaiProPyError("Event dispatch function is already defined!")
         self.event_dispatch = func
+        self.build_dispatch_tables()
+        return func
+
+    def on_control(self, control, **ids):
+        """Decorator that registers a handler for one kind of control
+
+        ids narrow it down to specific controls, e.g. on_control(APCMini.GridButton, x=3)
+        handles column 3 only, a control of None handles every control. Any number of
+        handlers can be registered for a control. Handlers can be async def functions,
+        they run on the controller's event loop.
+        """
+        id_names = control.__slots__[1:-1] if control is not None else ()  # Slots are controller, ids..., state or value
+        for name in ids:
+            if control is None:
+                raise errors.AkaiProPyError(f"A handler of every control can not narrow it down by id '{name}'")
+            if name not in id_names:
+                raise errors.AkaiProPyError(f"{control.__name__} has no id '{name}', valid ids are {id_names}")
+
+        def register(func):
+            self.subscriptions.append((control, ids, func))
+            self.build_dispatch_tables()
+            return func
+        return register
+
+    def remove_handler(self, func):
+        """Removes a handler registered with on_control or one of the on_* decorators"""
+        self.subscriptions = [subscription for subscription in self.subscriptions if subscription[2] is not func]
+        self.build_dispatch_tables()
+
+    def build_dispatch_tables(self):
+        """Precomputes the handlers of every note and control, so a message costs one lookup"""
+        for handlers, decode in ((self.note_handlers, self.NoteDecode), (self.control_handlers, self.ControlDecode)):
+            for number, entry in enumerate(decode):
+                if entry is None:
+                    continue
+                control, ids = entry
+                id_values = dict(zip(control.__slots__[1:-1], ids))
+                funcs = [
+                    func for subscribed, match, func in self.subscriptions
+                    if (subscribed is None or subscribed is control) and all(
+                        value is None or id_values[name] == value for name, value in match.items())
+                ]
+                if self.event_dispatch is not None:
+                    funcs.append(self.event_dispatch)
+                handlers[number] = tuple(funcs)
+
+    def events(self, control=None, maxsize=256, **ids):
+        """Async iterator over the events of the controller, optionally only of one control
+
+        async for event in controller.events(): ...
+        At most maxsize events are buffered, the oldest are dropped after that.
+        Close the iterator (or use it with async with) to stop receiving events.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = self.loop
+        return EventStream(self, loop, control, ids, maxsize)
 
     def on_ready(self, func):
+        """Calls func once the controller identified, right away if it already did
+
+        func is called again every time the device is identified again, e.g.
+        after a hot-plug reconnect.
+        """
         if self.ready_dispatch is not None:
             raise errors.AkaiProPyError("Ready event function already defined!")
         self.ready_dispatch = func
+        self.ready.add_done_callback(self.call_ready_dispatch)
+
+    def call_ready_dispatch(self, ready):
+        if ready.exception() is None and self.ready_dispatch is not None:
+            self.ready_dispatch()
+
+    def new_ready(self):
+        """Replaces ready with a new future that calls the on_ready function, call with _identify_lock held"""
+        self.ready = Future()
+        if self.ready_dispatch is not None:
+            self.ready.add_done_callback(self.call_ready_dispatch)
+        return self.ready
+
+    def wait_ready(self, timeout=None):
+        """Blocks until the controller identified, raises ControllerIdentificationError if it did not"""
+        return self.ready.result(timeout)
+
+    async def wait_ready_async(self):
+        """Same as wait_ready for asyncio code"""
+        return await asyncio.wrap_future(self.ready)
+
+    def start_identification(self):
+        """Sends the Device Enquiry, input is buffered until the device answered, returns the ready future"""
+        with self._identify_lock:
+            return self.restart_identification()
+
+    def restart_identification(self):
+        """start_identification, call with _identify_lock held"""
+        if self._identify_timer is not None:
+            self._identify_timer.cancel()
+        if self.ready.done():
+            self.new_ready()
+        self.setup_in_progress = True
+        self._identify_tries = 0
+        self.send_enquiry()
+        return self.ready
+
+    def start_confirmation(self, identity):
+        """Takes a cached identity as ready and checks it with a Device Enquiry in the background"""
+        with self._identify_lock:
+            self.identity = tuple(identity)
+            self.confirmed = Future()
+            self.setup_in_progress = False
+            self.ready.set_result(self)
+            self._identify_tries = 0
+            self.send_enquiry()
+
+    def send_enquiry(self):
+        """Sends the Device Enquiry and tries again after identify_timeout, call with _identify_lock held"""
+        self._identify_tries += 1
+        self.write(bytes(self.DeviceEnquiry))
+        if self.identify_timeout is not None:
+            self._identify_timer = threading.Timer(self.identify_timeout, self.identify_timed_out)
+            self._identify_timer.daemon = True
+            self._identify_timer.start()
+
+    @property
+    def confirming(self):
+        """True while a cached identity is in use and the device did not confirm it yet"""
+        return self.confirmed is not None and not self.confirmed.done() and self.ready.done()
+
+    def identify_timed_out(self):
+        with self._identify_lock:
+            if self.ready.done() and not self.confirming:
+                return
+            if self._identify_tries <= self.identify_retries:
+                try:
+                    self.send_enquiry()
+                except Exception as error:  # The port went away, nothing else would see it on the timer thread
+                    self.fail_identification(errors.ControllerIdentificationError(
+                        self, self.midi_in, f"Sending the Device Enquiry failed: {error}"))
+                return
+            if self.confirming:
+                # A slow device may still be the cached one: identify it like a device that is not cached, its
+                # input is buffered until then and ready is a new future that fails if it does not answer either
+                self.restart_identification()
+                return
+            self.fail_identification(errors.ControllerIdentificationError(
+                self, self.midi_in, f"No answer to the Device Enquiry after {self._identify_tries} tries"))
+
+    @staticmethod
+    def is_identity_reply(event):
+        return event.type == "sysex" and len(event.data) >= 6 and event.data[2] == 6 and event.data[3] == 2
+
+    def on_sysex(self, event):
+        """Handles SysEx after identification, an identity reply confirms a cached identity"""
+        if not self.confirming or not self.is_identity_reply(event):
+            return
+        with self._identify_lock:
+            if self._identify_timer is not None:
+                self._identify_timer.cancel()
+            try:
+                self.product_detect(event)
+            except errors.ControllerIdentificationError as error:
+                self.fail_identification(error)
+                return
+            if tuple(event.data) != self.identity:  # Same device with e.g. new firmware
+                self.identity = tuple(event.data)
+                self.port_cache.put(self.midi_in.name, self.midi_out.name, self.identity)
+            self.confirmed.set_result(self)
+
+    def fail_identification(self, error):
+        """Fails ready and stops handling input, call with _identify_lock held
+
+        A cached identity that was not confirmed is stale: its entry is removed
+        and confirmed fails too. As ready already succeeded with it, ready is
+        replaced by a new future holding the error, so wait_ready() and
+        start() raise it.
+        """
+        self.setup_in_progress = True
+        if self.confirmed is not None and not self.confirmed.done():
+            self.port_cache.remove(self.midi_in.name, self.midi_out.name)
+            self.confirmed.set_exception(error)
+        if self.ready.done():
+            self.new_ready()
+        self.ready.set_exception(error)
 
     def on_midi_in(self, event):
         if self.setup_in_progress:
-            product_detect_success = self.product_detect(event)
-            if product_detect_success and self.ready_dispatch is not None:
-                self.ready_dispatch()
+            self.on_setup_message(event)
         else:
             self.pre_event_dispatch(event)
 
+    def on_setup_message(self, event):
+        """Handles a message that arrived before the controller identified"""
+        if not self.is_identity_reply(event):
+            self.early_input.append(event)  # Not the identity reply, handled once the controller identified
+            return
+        try:
+            self.product_detect(event)
+        except errors.ControllerIdentificationError as error:
+            self.finish_identification(error)
+        else:
+            self.identity = tuple(event.data)
+            self.finish_identification()
+
+    def finish_identification(self, error=None):
+        """Completes the ready future, after replaying the input that arrived during identification
+
+        A device that answers after identification timed out is still taken,
+        ready (and confirmed) are then replaced by new futures.
+        """
+        with self._identify_lock:
+            if self._identify_timer is not None:
+                self._identify_timer.cancel()
+            if error is not None:
+                if not self.ready.done():
+                    self.fail_identification(error)
+                return
+            if self.ready.done():
+                if self.ready.exception() is None:
+                    return
+                self.new_ready()  # The answer came late, the device is usable after all
+                if self.confirmed is not None and self.confirmed.done():
+                    self.confirmed = Future()
+            self.setup_in_progress = False
+            early_input = list(self.early_input)
+            self.early_input.clear()
+            # A cached identity whose confirmation timed out, the device turned out to be the cached one after all
+            confirmed = self.confirmed if self.confirmed is not None and not self.confirmed.done() else None
+            restore, self.restore_on_ready = self.restore_on_ready, False
+        if self.port_cache is not None:  # The next start can skip the enquiry
+            self.port_cache.put(self.midi_in.name, self.midi_out.name, self.identity)
+        for event in early_input:
+            self.pre_event_dispatch(event)
+        if restore:  # Queued before ready is done, so waiting for ready and then the output sees them sent
+            self.restore_leds()
+        self.ready.set_result(self)
+        if confirmed is not None:
+            confirmed.set_result(self)
+
+    def on_midi_bytes(self, message, data=None):
+        """Callback for raw input, message is the (bytes, delta time) tuple of the MIDI backend"""
+        midi_bytes = message[0]
+        if self.setup_in_progress:
+            import mido
+            try:
+                event = mido.Message.from_bytes(midi_bytes)  # Identification is rare, let mido parse the SysEx
+            except ValueError:
+                return
+            self.on_midi_in(event)
+        else:
+            self.pre_event_dispatch_bytes(midi_bytes)
+
+    def listen_raw(self, port):
+        """Delivers the raw bytes a mido input port receives to on_midi_bytes"""
+        rtmidi_in = getattr(port, "_rt", None)
+        if rtmidi_in is not None:  # The rtmidi backend hands over the bytes before mido parses them
+            # Like mido's callback setter: the callback must not run while it is swapped, and messages that are
+            # already waiting (e.g. while discover() had no callback set) are handled first
+            with getattr(port, "_callback_lock", None) or threading.RLock():
+                rtmidi_in.cancel_callback()
+                queue = getattr(port, "_queue", None)
+                if queue is not None:
+                    for event in queue.iterpoll():
+                        self.on_midi_in(event)
+                rtmidi_in.set_callback(self.on_midi_bytes)
+        elif hasattr(port, "set_raw_callback"):  # Ports that are not mido's can hand over the bytes too
+            port.set_raw_callback(self.on_midi_bytes)
+        else:
+            port.callback = lambda event: self.on_midi_bytes((event.bytes(), 0.0))
+
     def product_detect(self, event):
         try:
-            if event.data[4] != 6:
+            if event.data[2] != 6:
                 raise errors.ControllerIdentificationError(self, self.midi_in, "Controller did not identify!")
-        except KeyError:
+        except (AttributeError, IndexError):
             raise errors.ControllerIdentificationError(self, self.midi_in, "Controller failed to identify!")
         self.setup_in_progress = False
         return True
 
+    @classmethod
+    def build_decode_tables(cls, notes=(), controls=()):
+        """Builds the decode tables of a device from (number, control class, ids) entries
+
+        Every incoming message is then resolved with a single index, the control
+        class is created with the controller, the ids and the state or value.
+        """
+        cls.NoteDecode = [None] * 128
+        cls.ControlDecode = [None] * 128
+        for table, entries in ((cls.NoteDecode, notes), (cls.ControlDecode, controls)):
+            for number, control, ids in entries:
+                table[number] = (control, ids)
+
+    @staticmethod
+    def decode_ids(table, number, control):
+        """Returns the ids a decode table holds for a number, None if it is not that control"""
+        entry = table[number] if 0 <= number <= 127 else None
+        if entry is None or entry[0] is not control:
+            return None
+        return entry[1]
+
     def pre_event_dispatch(self, event):
-        if self.event_dispatch is None:
-            return  # Ignore if a dispatch event is not set with the on_event decorator
+        if event.type == "control_change":  # Event is a fader or knob change
+            self.dispatch_control(event.control, event.value)
+        elif event.type == "note_on" or event.type == "note_off":  # Event is a button press
+            self.dispatch_note(event.note, event.type == "note_on")
+        elif event.type == "sysex":
+            self.on_sysex(event)
+
+    def pre_event_dispatch_bytes(self, data):
+        """Same as pre_event_dispatch for a raw MIDI message"""
+        if len(data) != 3:
+            if data and data[0] == 0xF0 and self.confirming:  # SysEx is rare, let mido parse it
+                import mido
+                self.on_sysex(mido.Message.from_bytes(data))
+            return  # Only note and control change messages are decoded
+
+        status = data[0] & 0xF0
+        if status == 0xB0:  # control_change, a fader or knob change
+            self.dispatch_control(data[1], data[2])
+        elif status == 0x90:  # note_on, a button press
+            self.dispatch_note(data[1], True)
+        elif status == 0x80:  # note_off, a button release
+            self.dispatch_note(data[1], False)
+
+    def dispatch_control(self, control_number, value):
+        handlers = self.control_handlers[control_number]
+        if not handlers:
+            return  # Ignore controls nobody handles and controls the device does not have
+        entry = self.ControlDecode[control_number]  # Also the key for coalescing its values
+        control, ids = entry
+        if self.input_queue is not None:
+            self.input_queue.put(control(self, *ids, value), handlers, key=entry, lane=control_number)
+        else:
+            self.deliver(control(self, *ids, value), handlers)
+
+    def dispatch_note(self, note, state):
+        handlers = self.note_handlers[note]
+        if not handlers:
+            return  # Ignore buttons nobody handles and buttons the device does not have
+        button = self.button_events[state][note]
+        if button is None:  # First press or release of this button, buttons are immutable so keep it
+            control, ids = self.NoteDecode[note]
+            button = self.button_events[state][note] = control(self, *ids, state)
+        if self.input_queue is not None:
+            self.input_queue.put(button, handlers, lane=note)
+        else:
+            self.deliver(button, handlers)
+
+    def deliver(self, event, handlers):
+        """Hands a decoded event to its handlers"""
+        for handler in handlers:
+            result = handler(event)
+            if result is not None and isinstance(result, types.CoroutineType):  # async def handler
+                asyncio.run_coroutine_threadsafe(result, self.loop).add_done_callback(self.report_handler_error)
+
+    @staticmethod
+    def report_handler_error(future):
+        """Prints the exception of an async handler, nothing else would see it"""
+        exception = None if future.cancelled() else future.exception()
+        if exception is not None:
+            traceback.print_exception(type(exception), exception, exception.__traceback__)
+
+    @property
+    def overflowed_input(self):
+        """Events that were dropped because the input queue was full"""
+        return getattr(self.input_queue, "overflowed", 0)
+
+    @property
+    def dropped_input(self):
+        """Fader and knob values that were replaced by a newer one before the handler saw them"""
+        return self.input_queue.dropped if self.input_queue is not None else 0
+
+    def input_stats(self):
+        """Queue depth and handler latency of the input queue, None when handlers run on the MIDI callback"""
+        return self.input_queue.stats() if self.input_queue is not None else None
 
     def start(self):
-        """Start the event loop for receiving MIDI messages"""
+        """Start the event loop for receiving MIDI messages, raises if the controller did not identify"""
+        self.wait_ready()
         self.loop.run_forever()
 
@@ -1,8 +1,25 @@
-import mido
-import asyncio
-import time
-
-from .base_controller import Controller
-from .MIDIMix import MIDIMix
-from .APCmini import APCMini
-from .APCminimkii import APCMinimkii
+import importlib
+
+# Every name is imported from its module on first use, so a script only loads what it uses
+_modules = {
+    "Controller": ".base_controller",
+    "MIDIMix": ".MIDIMix",
+    "APCMini": ".APCmini",
+    "APCMinimkii": ".APCminimkii",
+    "ControllerHub": ".hub",
+    "discover": ".discovery",
+}
+
+__all__ = list(_modules)
+
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_modules[name], __package__), name)
+    globals()[name] = value  # Later lookups do not go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules))
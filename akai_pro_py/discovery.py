@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+
+import mido
+
+from .APCmini import APCMini
+from .APCminimkii import APCMinimkii
+from .MIDIMix import MIDIMix
+from .base_controller import Controller
+
+Devices = (APCMini, APCMinimkii, MIDIMix)  # Controllers discover() looks for
+
+
+def port_key(name):
+    """Name of a port without the numbers the MIDI backend adds, to pair inputs with outputs"""
+    return re.sub(r"[\s\d:]+$", "", name)
+
+
+def pair_ports(input_names, output_names):
+    """Returns (input name, output name) of the ports that belong to the same device
+
+    Ports are paired by their name, or by their name without the numbers
+    the MIDI backend adds when there is no exact match.
+    """
+    paired = {name: name for name in output_names if name in input_names}
+    used = set(paired)
+    for output_name in output_names:
+        if output_name in paired:
+            continue
+        for input_name in input_names:
+            if input_name not in used and port_key(input_name) == port_key(output_name):
+                paired[output_name] = input_name
+                used.add(input_name)
+                break
+    return [(paired[name], name) for name in output_names if name in paired]
+
+
+AkaiManufacturerID = 71
+
+
+def identity_reply(message):
+    """Returns (manufacturer, product) of a Device Enquiry reply, None for any other message"""
+    if message.type != "sysex":
+        return None
+    data = message.data
+    if len(data) < 6 or data[2] != 6 or data[3] != 2:
+        return None
+    return data[4], data[5]
+
+
+def discover(timeout=1.0, ports=None, devices=Devices, hub=None, port_factory=None, **kwargs):
+    """Finds the connected controllers and returns them ready to use
+
+    The Device Enquiry is sent to every port at once and the replies are
+    collected until every port answered or timeout seconds passed, so
+    startup takes one round trip however many ports there are. ports
+    optionally limits the search to these (input name, output name) pairs,
+    devices are the controller classes to look for. The controllers are
+    added to hub if one is given, kwargs go to every controller. Ports are
+    opened with port_factory, mido if it is None.
+    """
+    factory = Controller.get_port_factory(port_factory)
+    if ports is None:
+        ports = pair_ports(factory.get_input_names(), factory.get_output_names())
+    by_product = {device.ProductID: device for device in devices}
+    replies = {}  # (input name, output name) -> (manufacturer, product)
+    condition = threading.Condition()
+    opened = []
+
+    def collect(pair):
+        def on_message(message):
+            identity = identity_reply(message)
+            if identity is not None:
+                with condition:
+                    replies.setdefault(pair, identity)
+                    condition.notify()
+        return on_message
+
+    try:
+        for pair in ports:
+            input_name, output_name = pair
+            try:
+                midi_in = factory.open_input(input_name, callback=collect(pair))
+            except (OSError, IOError):  # Busy or gone, another program may own it
+                continue
+            try:
+                midi_out = factory.open_output(output_name)
+            except (OSError, IOError):
+                midi_in.close()
+                continue
+            opened.append((pair, midi_in, midi_out))
+        enquiry = mido.Message.from_bytes(Controller.DeviceEnquiry)
+        for pair, midi_in, midi_out in opened:  # Every device answers while the others are still being asked
+            midi_out.send(enquiry)
+
+        deadline = time.monotonic() + timeout
+        with condition:
+            condition.wait_for(lambda: len(replies) >= len(opened), max(deadline - time.monotonic(), 0))
+            found = dict(replies)
+    except BaseException:
+        for pair, midi_in, midi_out in opened:
+            midi_in.close()
+            midi_out.close()
+        raise
+
+    controllers = []
+    for pair, midi_in, midi_out in opened:
+        manufacturer, product = found.get(pair, (None, None))
+        device = by_product.get(product) if manufacturer == AkaiManufacturerID else None
+        if device is None:  # Not a controller we know, leave the port alone
+            midi_in.close()
+            midi_out.close()
+            continue
+        midi_in.callback = None
+        if hub is not None:
+            controller = device(midi_in, midi_out, identify=False, loop=hub.loop, port_factory=port_factory,
+                                **kwargs)
+            hub.add(controller)
+        else:
+            controller = device(midi_in, midi_out, identify=False, port_factory=port_factory, **kwargs)
+        controllers.append(controller)
+    return controllers
@@ -0,0 +1,31 @@
+class LEDEncoder:
+    """Encodes LED updates as raw note_on messages from prebuilt tables
+
+    The messages for the given notes on channel 0 are built when the encoder
+    is created, any other note or channel gets its table on first use.
+    """
+
+    def __init__(self, notes=()):
+        self._rows = [[None] * 128 for _ in range(16)]  # channel -> note -> message for each velocity
+        for note in notes:
+            self._rows[0][note] = LEDEncoder.build_row(0, note)
+
+    @staticmethod
+    def build_row(channel, note):
+        """Builds the messages for every velocity of one note"""
+        if not 0 <= channel <= 15 or not 0 <= note <= 127:
+            raise ValueError(f"Invalid MIDI channel {channel} or note {note}")
+        status = 0x90 | channel  # note_on
+        return tuple(bytes((status, note, velocity)) for velocity in range(128))
+
+    def encode(self, note, velocity, channel=0):
+        """Returns the raw note_on message that sets a note to the given velocity"""
+        if not 0 <= velocity <= 127:
+            raise ValueError(f"Invalid MIDI velocity {velocity}")
+        try:
+            row = self._rows[channel][note]
+        except IndexError:
+            raise ValueError(f"Invalid MIDI channel {channel} or note {note}")
+        if row is None:
+            row = self._rows[channel][note] = LEDEncoder.build_row(channel, note)
+        return row[velocity]
@@ -0,0 +1,248 @@
+import collections
+import threading
+import time
+import traceback
+
+
+class EventQueue:
+    """Hands events from the MIDI callback to a handler running on its own thread
+
+    The handler is called with the arguments given to put(). Events put with
+    a key are continuous controls (faders, knobs): with coalesce a newer
+    value for the same key replaces one that is still waiting for the
+    handler, so a slow handler only sees the latest value. Events without a
+    key (buttons) are always delivered, in order.
+
+    With a capacity at most that many events wait, overflow decides what
+    happens to an event that does not fit: "drop_oldest" drops the oldest
+    waiting event, "drop_newest" drops the new one and "coalesce" replaces
+    the waiting value of the same continuous control, dropping the oldest
+    event if there is none.
+    """
+
+    OverflowPolicies = ("drop_oldest", "drop_newest", "coalesce")
+
+    def __init__(self, handler, name="akai_pro_py input", coalesce=True, capacity=None, overflow="drop_oldest"):
+        if overflow not in EventQueue.OverflowPolicies:
+            raise ValueError(f"Unknown overflow policy '{overflow}', valid options are {EventQueue.OverflowPolicies}")
+        if capacity is not None and capacity < 1:
+            raise ValueError("An event queue needs a capacity of at least one event")
+        self.handler = handler
+        self.name = name  # Name of the handler thread
+        self.coalesce = coalesce
+        self.capacity = capacity  # Most events that may wait, None for no limit
+        self.overflow = overflow
+        self.dropped = 0  # Intermediate values that were replaced before the handler saw them
+        self.dropped_by_key = collections.Counter()  # key -> replaced values
+        self.overflowed = 0  # Events dropped because the queue was full
+        self.handled = 0
+        self.max_depth = 0  # Most events that were waiting at once
+        self.wait_total = 0.0  # Seconds events waited for the handler
+        self.wait_max = 0.0
+        self.handler_time_total = 0.0  # Seconds spent in the handler
+        self.handler_time_max = 0.0
+        self._queue = collections.deque()  # Items are [put time, handler arguments, key]
+        self._latest = {}  # key -> newest waiting item of a continuous control
+        self._condition = threading.Condition()
+        self._busy = False  # Handler is running
+        self._thread = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, *args, key=None, lane=None):
+        """Queues an event, called from the MIDI callback
+
+        lane is accepted for the same signature as HandlerPool.put(), a single
+        queue keeps every event in order.
+        """
+        now = time.perf_counter()
+        with self._condition:
+            full = self.capacity is not None and len(self._queue) >= self.capacity
+            if key is not None and (self.coalesce or (full and self.overflow == "coalesce")):
+                waiting = self._latest.get(key)
+                if waiting is not None:
+                    waiting[0] = now
+                    waiting[1] = args  # The older value is never delivered
+                    self.dropped += 1
+                    self.dropped_by_key[key] += 1
+                    return
+            if full:
+                self.overflowed += 1
+                if self.overflow == "drop_newest":
+                    return
+                self._forget(self._queue.popleft())
+            item = [now, args, key]
+            self._queue.append(item)
+            if key is not None:
+                self._latest[key] = item
+            self.max_depth = max(self.max_depth, len(self._queue))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _forget(self, item):  # An item left the queue
+        key = item[2]
+        if key is not None and self._latest.get(key) is item:
+            del self._latest[key]
+
+    def join(self, timeout=None):
+        """Blocks until every queued event was handled, returns False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def stats(self):
+        """Queue depth and handler latency, times are in seconds"""
+        with self._condition:
+            handled = max(self.handled, 1)
+            return {
+                "depth": len(self._queue),
+                "max_depth": self.max_depth,
+                "capacity": self.capacity,
+                "handled": self.handled,
+                "dropped": self.dropped,
+                "overflowed": self.overflowed,
+                "wait_avg": self.wait_total / handled,
+                "wait_max": self.wait_max,
+                "handler_time_avg": self.handler_time_total / handled,
+                "handler_time_max": self.handler_time_max,
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue)
+                item = self._queue.popleft()
+                self._forget(item)
+                self._busy = True
+            put_time, args, _ = item
+            start = time.perf_counter()
+            try:
+                self.handler(*args)
+            except Exception:  # A failing handler must not stop the delivery of later events
+                traceback.print_exc()
+            finally:
+                end = time.perf_counter()
+                with self._condition:
+                    self.handled += 1
+                    self.wait_total += start - put_time
+                    self.wait_max = max(self.wait_max, start - put_time)
+                    self.handler_time_total += end - start
+                    self.handler_time_max = max(self.handler_time_max, end - start)
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+class HandlerPool:
+    """Runs a handler on a pool of threads, keeping the events of each control in order
+
+    Every lane (a control) always goes to the same worker, so its events are
+    handled one after another in the order they came in, while different
+    controls are handled in parallel. The other arguments are those of
+    EventQueue, the capacity is per worker.
+    """
+
+    def __init__(self, handler, workers=4, coalesce=True, capacity=None, overflow="drop_oldest"):
+        if workers < 1:
+            raise ValueError("A handler pool needs at least one worker")
+        self.queues = [
+            EventQueue(handler, f"akai_pro_py input {number}", coalesce, capacity, overflow)
+            for number in range(workers)
+        ]
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues)
+
+    @property
+    def dropped(self):
+        return sum(queue.dropped for queue in self.queues)
+
+    @property
+    def overflowed(self):
+        return sum(queue.overflowed for queue in self.queues)
+
+    @property
+    def dropped_by_key(self):
+        return sum((queue.dropped_by_key for queue in self.queues), collections.Counter())
+
+    def put(self, *args, key=None, lane=None):
+        """Queues an event on the worker of its lane, called from the MIDI callback"""
+        self.queues[hash(lane) % len(self.queues)].put(*args, key=key)
+
+    def join(self, timeout=None):
+        """Blocks until every queued event was handled, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for queue in self.queues:
+            if not queue.join(None if deadline is None else max(deadline - time.monotonic(), 0)):
+                return False
+        return True
+
+    def stats(self):
+        """Queue depth and handler latency over all workers, plus the stats of each worker"""
+        workers = [queue.stats() for queue in self.queues]
+        handled = sum(worker["handled"] for worker in workers)
+        weight = max(handled, 1)
+        return {
+            "depth": sum(worker["depth"] for worker in workers),
+            "max_depth": max(worker["max_depth"] for worker in workers),
+            "capacity": self.queues[0].capacity,
+            "handled": handled,
+            "dropped": sum(worker["dropped"] for worker in workers),
+            "overflowed": sum(worker["overflowed"] for worker in workers),
+            "wait_avg": sum(worker["wait_avg"] * worker["handled"] for worker in workers) / weight,
+            "wait_max": max(worker["wait_max"] for worker in workers),
+            "handler_time_avg": sum(worker["handler_time_avg"] * worker["handled"] for worker in workers) / weight,
+            "handler_time_max": max(worker["handler_time_max"] for worker in workers),
+            "workers": workers,
+        }
+
+
+class LoopDispatcher:
+    """Hands events from the MIDI callback to a handler running on an asyncio event loop
+
+    Events are scheduled with call_soon_threadsafe, so handlers run on the
+    thread running the loop. With coalesce keys coalesce values like EventQueue.
+    """
+
+    def __init__(self, loop, handler, coalesce=True):
+        self.loop = loop
+        self.handler = handler
+        self.coalesce = coalesce
+        self.dropped = 0  # Intermediate values that were replaced before the handler saw them
+        self.dropped_by_key = collections.Counter()  # key -> replaced values
+        self.handled = 0
+        self._latest = {}  # key -> handler arguments with the newest value of a continuous control
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._latest)
+
+    def put(self, *args, key=None, lane=None):
+        """Schedules an event on the loop, called from the MIDI callback"""
+        if key is None or not self.coalesce:
+            self.loop.call_soon_threadsafe(self._handle, args)
+            return
+        with self._lock:
+            scheduled = key in self._latest
+            self._latest[key] = args  # The older value is never delivered
+            if scheduled:
+                self.dropped += 1
+                self.dropped_by_key[key] += 1
+                return
+        self.loop.call_soon_threadsafe(self._handle_latest, key)
+
+    def _handle_latest(self, key):
+        with self._lock:
+            args = self._latest.pop(key)
+        self._handle(args)
+
+    def _handle(self, args):
+        self.handled += 1
+        try:
+            self.handler(*args)
+        except Exception:  # A failing handler must not stop the loop
+            traceback.print_exc()
+
+    def stats(self):
+        return {"depth": len(self._latest), "handled": self.handled, "dropped": self.dropped}
@@ -0,0 +1,20 @@
+class Control:
+    """Base of the controls a controller reports, slotted so instances carry no __dict__"""
+    __slots__ = ()
+
+
+class Button(Control):
+    """Base of the buttons a controller reports
+
+    Attributes can only be set once, so a controller can hand out the same
+    instance for every press (and every release) of a button.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"'{type(self).__name__}' attribute '{name}' is read-only")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{type(self).__name__}' attribute '{name}' is read-only")
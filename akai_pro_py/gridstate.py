@@ -0,0 +1,148 @@
+from . import errors
+
+numpy = None  # NumPy is optional and slow to import, the first GridState imports it
+
+
+class GridState:
+    """NumPy representation of the button grid LEDs
+
+    colours (and effects on controllers that have them) are uint8 arrays
+    indexed [x, y] like set_led. The drawing methods only change the arrays,
+    flush() compares them with the controller's shadow LED state and sends
+    the buttons that differ, so LEDs set by other code are repainted too.
+    """
+
+    def __init__(self, controller, grid_mapping, max_colour, colour_names=None,
+                 max_effect=None, effect_names=None, effect=0):
+        global numpy
+        if numpy is None:
+            try:
+                import numpy
+            except ImportError:
+                raise errors.AkaiProPyError("GridState requires NumPy, install it with 'pip install numpy'") from None
+        self.controller = controller
+        self.max_colour = max_colour
+        self.colour_names = colour_names or {}
+        self.max_effect = max_effect
+        self.effect_names = effect_names or {}
+        self.notes = numpy.array(grid_mapping, dtype=numpy.uint8)  # [x, y] -> MIDI note
+        self.colours = numpy.zeros(self.notes.shape, dtype=numpy.uint8)
+        self.effects = None if max_effect is None else numpy.full(self.notes.shape, effect, dtype=numpy.uint8)
+        self._note_list = self.notes.ravel().tolist()
+        self._invalid = False  # Send every button on the next flush
+
+    @property
+    def width(self):
+        return self.notes.shape[0]
+
+    @property
+    def height(self):
+        return self.notes.shape[1]
+
+    def _colour(self, colour):
+        return self.colour_names.get(colour, colour) if isinstance(colour, str) else colour
+
+    def _effect(self, effect):
+        return self.effect_names.get(effect, effect) if isinstance(effect, str) else effect
+
+    def fill_rect(self, x, y, width, height, colour, effect=None):
+        """Fills a rectangle, parts outside of the grid are ignored"""
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, self.width), min(y + height, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.colours[x0:x1, y0:y1] = self._colour(colour)
+        if effect is not None and self.effects is not None:
+            self.effects[x0:x1, y0:y1] = self._effect(effect)
+
+    def fill(self, colour, effect=None):
+        """Fills the whole grid"""
+        self.fill_rect(0, 0, self.width, self.height, colour, effect)
+
+    def fill_row(self, y, colour, effect=None):
+        self.fill_rect(0, y, self.width, 1, colour, effect)
+
+    def fill_column(self, x, colour, effect=None):
+        self.fill_rect(x, 0, 1, self.height, colour, effect)
+
+    def blit(self, colours, x=0, y=0, effects=None):
+        """Copies a 2D array of colours (and effects) indexed [x, y] to the grid at x, y, clipped to the grid"""
+        colours = numpy.asarray(colours)
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + colours.shape[0], self.width), min(y + colours.shape[1], self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        self.colours[x0:x1, y0:y1] = colours[x0 - x:x1 - x, y0 - y:y1 - y]
+        if effects is not None and self.effects is not None:
+            self.effects[x0:x1, y0:y1] = numpy.asarray(effects)[x0 - x:x1 - x, y0 - y:y1 - y]
+
+    def shift(self, dx, dy, colour=0, effect=None):
+        """Moves the grid contents by dx, dy, buttons that are uncovered are filled with colour"""
+        self.colours[:] = self._shifted(self.colours, dx, dy, self._colour(colour))
+        if self.effects is not None:
+            fill = self.effects if effect is None else self._effect(effect)
+            self.effects[:] = self._shifted(self.effects, dx, dy, fill)
+
+    def scroll(self, dx, dy):
+        """Moves the grid contents by dx, dy, wrapping around at the edges"""
+        self.colours[:] = numpy.roll(self.colours, (dx, dy), axis=(0, 1))
+        if self.effects is not None:
+            self.effects[:] = numpy.roll(self.effects, (dx, dy), axis=(0, 1))
+
+    @staticmethod
+    def _shifted(array, dx, dy, fill):
+        if numpy.ndim(fill):
+            shifted = numpy.array(fill, dtype=array.dtype)  # Keep the old values where nothing moves in
+        else:
+            shifted = numpy.full_like(array, fill)
+        width, height = array.shape
+        if abs(dx) < width and abs(dy) < height:
+            shifted[max(dx, 0):width + min(dx, 0), max(dy, 0):height + min(dy, 0)] = \
+                array[max(-dx, 0):width + min(-dx, 0), max(-dy, 0):height + min(-dy, 0)]
+        return shifted
+
+    def update(self, mask, colour, effect=None):
+        """Sets the buttons where mask is true, colour and effect are single values or arrays"""
+        numpy.copyto(self.colours, numpy.asarray(self._colour(colour), dtype=numpy.uint8), where=mask)
+        if effect is not None and self.effects is not None:
+            numpy.copyto(self.effects, numpy.asarray(self._effect(effect), dtype=numpy.uint8), where=mask)
+
+    def invalidate(self):
+        """Forgets what was sent, the next flush sends every button"""
+        self._invalid = True
+
+    def shown(self):
+        """Colours and effects the controller's shadow LED state holds for the grid, -1 where it is unknown"""
+        led_state = self.controller.led_state
+        shown = numpy.array([led_state.get(note, (-1, -1)) for note in self._note_list], dtype=numpy.int16)
+        shown = shown.reshape(self.notes.shape + (2,))
+        return shown[..., 0], shown[..., 1]
+
+    def flush(self, force=False):
+        """Sends every button the device does not show yet, returns the number of messages sent"""
+        if self.colours.max() > self.max_colour:
+            x, y = numpy.argwhere(self.colours > self.max_colour)[0]
+            raise errors.ControllerError(
+                f"Grid colour {self.colours[x, y]} at {x},{y} is out of range 0-{self.max_colour}")
+        shown_colours, shown_effects = self.shown()
+        changed = self.colours != shown_colours
+        if self.effects is None:
+            changed |= shown_effects != 0
+        else:
+            if self.effects.max() > self.max_effect:
+                x, y = numpy.argwhere(self.effects > self.max_effect)[0]
+                raise errors.ControllerError(
+                    f"Grid effect {self.effects[x, y]} at {x},{y} is out of range 0-{self.max_effect}")
+            changed |= self.effects != shown_effects
+        force = force or self._invalid
+        self._invalid = False
+        if force:
+            changed[:] = True
+        xs, ys = numpy.nonzero(changed)
+        notes = self.notes[xs, ys].tolist()
+        colours = self.colours[xs, ys].tolist()
+        effects = [0] * len(notes) if self.effects is None else self.effects[xs, ys].tolist()
+        sent = 0
+        for note, colour, effect in zip(notes, colours, effects):
+            sent += self.controller.send_led(note, colour, channel=effect, force=force)
+        return sent
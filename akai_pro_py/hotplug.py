@@ -0,0 +1,74 @@
+import threading
+import traceback
+
+from .base_controller import Controller
+from .discovery import port_key
+
+
+class HotplugMonitor:
+    """Reopens the ports of controllers that were unplugged once they are plugged in again
+
+    Polls the port list every interval seconds on a background thread. When
+    a port of a controller is gone the controller is disconnected, when
+    ports with the same name come back (the numbers the MIDI backend adds
+    may change) the controller reconnects, identifies the device again and
+    restores its LEDs. The input of other controllers is not held up. The
+    port list comes from port_factory, the first controller's if it is None.
+    """
+
+    def __init__(self, controllers, interval=1.0, port_factory=None):
+        self.controllers = list(controllers)
+        self.interval = interval
+        if port_factory is None and self.controllers:
+            port_factory = self.controllers[0].port_factory
+        self.port_factory = Controller.get_port_factory(port_factory)
+        self.disconnects = 0
+        self.reconnects = 0
+        self._keys = {  # Port names without the numbers the backend adds, to find the ports again
+            id(controller): (port_key(controller.midi_in.name), port_key(controller.midi_out.name))
+            for controller in self.controllers
+        }
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts polling on a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="akai_pro_py hotplug", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self):
+        """Checks the port list once, returns the controllers that were reconnected"""
+        input_names = self.port_factory.get_input_names()
+        output_names = self.port_factory.get_output_names()
+        reconnected = []
+        for controller in self.controllers:
+            if controller.connected:
+                if controller.midi_in.name not in input_names or controller.midi_out.name not in output_names:
+                    controller.disconnect()
+                    self.disconnects += 1
+                continue
+            input_key, output_key = self._keys[id(controller)]
+            midi_in = next((name for name in input_names if port_key(name) == input_key), None)
+            midi_out = next((name for name in output_names if port_key(name) == output_key), None)
+            if midi_in is None or midi_out is None:
+                continue
+            try:
+                controller.reconnect(midi_in, midi_out)
+            except (OSError, IOError):  # Not ready yet, try again on the next poll
+                continue
+            self.reconnects += 1
+            reconnected.append(controller)
+        return reconnected
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:  # Keep monitoring, the backend can fail while devices come and go
+                traceback.print_exc()
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+from . import errors
+from .eventqueue import LoopDispatcher
+from .scheduler import OutputScheduler
+from .streams import MergedEventStream
+
+
+class ControllerHub:
+    """Runs any number of controllers on one event loop and one output thread
+
+    Handlers of every controller run on the hub's loop, events can also be
+    taken from all controllers at once in the order they were received with
+    events(). LED output of all controllers is sent by a single thread that
+    takes turns between the controllers, so a large update on one of them
+    does not hold back the others. Each controller keeps its own output rate.
+    """
+
+    def __init__(self, loop=None, coalesce_input=False):
+        self.loop = loop if loop is not None else asyncio.new_event_loop()
+        self.coalesce_input = coalesce_input  # Faders and knobs only keep their latest value until handled
+        self.controllers = []
+        self.streams = []  # Open MergedEventStreams
+        self._loops = {}  # controller -> its event loop before it was added, given back by remove()
+        self._received = 0.0  # Received time of the event being dispatched
+        self._merge_handler = self._merge  # Kept to remove the same handler again
+        self._output_condition = threading.Condition()
+        self._output_queued = False  # A controller queued output since the output thread last looked
+        self._output_thread = None
+        self._closed = False
+
+    def open(self, controller_class, midi_in=None, midi_out=None, **kwargs):
+        """Creates a controller (e.g. controllers.APCMini) and adds it to the hub"""
+        controller = controller_class(midi_in, midi_out, loop=self.loop, **kwargs)
+        try:
+            self.add(controller)
+        except errors.AkaiProPyError:
+            controller.output.close()
+            controller.disconnect()  # Close the ports it opened
+            raise
+        self._loops[controller] = None  # Created on the hub's loop, remove() gives it a loop of its own
+        return controller
+
+    def add(self, controller):
+        """Moves the input handling and LED output of a controller to the hub"""
+        if controller in self.controllers:
+            raise errors.AkaiProPyError(f"{controller.name} was already added to the hub")
+        queue = controller.input_queue
+        if queue is not None and not (isinstance(queue, LoopDispatcher) and queue.loop is self.loop):
+            # Handlers of a hub run on its loop, a handler thread, pool or input capacity would be dropped
+            raise errors.AkaiProPyError(
+                f"{controller.name} has its own input handling (handler_workers, input_capacity, coalesce_input or "
+                f"async_dispatch on another loop), create it without those to add it to a hub, use "
+                f"ControllerHub(coalesce_input=True) to coalesce fader and knob values")
+        self._loops[controller] = controller._loop
+        controller.loop = self.loop  # async handlers run on the hub's loop
+        coalesce = self.coalesce_input or (queue is not None and queue.coalesce)  # async_dispatch on the hub's loop
+        controller.input_queue = ControllerHub._Input(self, coalesce)
+        controller.output.join()  # Keep what was already queued in order
+        controller.output.close()
+        controller.output = OutputScheduler(controller.write, controller.output.rate, wake=self._wake_output)
+        controller.on_control(None)(self._merge_handler)
+        self.controllers.append(controller)
+        return controller
+
+    def remove(self, controller):
+        """Gives a controller its own event loop, input handling and output thread back"""
+        self.controllers.remove(controller)
+        controller.loop = self._loops.pop(controller)  # None for a new loop on first use
+        controller.remove_handler(self._merge_handler)
+        controller.input_queue = None
+        controller.output.join()
+        controller.output = OutputScheduler(controller.write, controller.output.rate)
+
+    def events(self, maxsize=256):
+        """Async iterator over (received time, event) of every controller, in the order they were received
+
+        async for received, event in hub.events(): ...
+        received is a time.monotonic() timestamp. At most maxsize events are
+        buffered, the earliest are dropped after that.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = self.loop
+        stream = MergedEventStream(self, loop, maxsize)
+        self.streams.append(stream)
+        return stream
+
+    def _dispatch(self, received, event, handlers):  # Runs on the hub's loop
+        self._received = received
+        event.controller.deliver(event, handlers)
+
+    def _merge(self, event):  # Handler of every control of every controller
+        for stream in self.streams:
+            if stream.loop is self.loop:
+                stream._push((self._received, event))
+            else:
+                stream.loop.call_soon_threadsafe(stream._push, (self._received, event))
+
+    def _wake_output(self):
+        with self._output_condition:
+            self._output_queued = True
+            if self._output_thread is None:
+                self._output_thread = threading.Thread(target=self._run_output, name="akai_pro_py hub output",
+                                                       daemon=True)
+                self._output_thread.start()
+            self._output_condition.notify()
+
+    def _run_output(self):
+        while not self._closed:
+            with self._output_condition:
+                self._output_queued = False
+            # Every controller sends at most one message per round, so they take turns
+            delays = [controller.output.poll() for controller in list(self.controllers)]
+            if 0 in delays:
+                continue
+            delays = [delay for delay in delays if delay is not None]
+            with self._output_condition:
+                if not self._output_queued and not self._closed:
+                    self._output_condition.wait(min(delays) if delays else None)
+
+    def monitor(self, interval=1.0):
+        """Starts a HotplugMonitor that reconnects any controller of the hub that was unplugged and comes back"""
+        from .hotplug import HotplugMonitor
+        return HotplugMonitor(self.controllers, interval).start()
+
+    def wait_output(self, timeout=None):
+        """Blocks until the output of every controller was sent, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for controller in self.controllers:
+            if not controller.output.join(None if deadline is None else max(deadline - time.monotonic(), 0)):
+                return False
+        return True
+
+    def close(self):
+        """Stops the output thread, output that was not sent yet is dropped"""
+        with self._output_condition:
+            self._closed = True
+            self._output_condition.notify()
+        for controller in self.controllers:
+            controller.output.close()
+        for stream in list(self.streams):
+            stream.close()
+
+    def start(self):
+        """Start the event loop of every controller on the hub, raises if a controller did not identify"""
+        for controller in self.controllers:
+            controller.wait_ready()
+        self.loop.run_forever()
+
+    class _Input(LoopDispatcher):  # Takes the received time of every event to the hub's loop
+        def __init__(self, hub, coalesce):
+            super().__init__(hub.loop, hub._dispatch, coalesce)
+
+        def put(self, *args, key=None, lane=None):
+            super().put(time.monotonic(), *args, key=key, lane=lane)
@@ -0,0 +1,281 @@
+"""In-memory MIDI backend with emulated controllers, to run without hardware
+
+    backend = LoopbackBackend(APCMiniEmulator())
+    apc = controllers.APCMini("APC MINI MIDI 1", "APC MINI MIDI 1", port_factory=backend)
+    emulator = backend.devices["APC MINI MIDI 1"]
+    emulator.press(APCMini.GridButton, 3, 4)  # Handlers see a grid button press
+    emulator.leds  # note -> (velocity, channel) the controller sent
+"""
+import collections
+import threading
+
+from .APCmini import APCMini
+from .APCminimkii import APCMinimkii
+from .MIDIMix import MIDIMix
+
+
+class LoopbackOutput:
+    """Output port that hands every message to an emulated device"""
+
+    def __init__(self, device, name):
+        self.device = device
+        self.name = name
+        self.closed = False
+
+    def send(self, message):
+        """Sends a mido message"""
+        self.send_bytes(message.bytes())
+
+    def send_bytes(self, data):
+        """Sends a raw MIDI message, used by Controller.raw_writer"""
+        if self.closed:
+            raise OSError(f"Port '{self.name}' is closed")
+        self.device.receive(bytes(data))
+
+    def close(self):
+        self.closed = True
+
+
+class LoopbackInput:
+    """Input port that receives what an emulated device sends
+
+    Messages go to the callback as mido messages, or as (bytes, delta time)
+    to the raw callback like the rtmidi backend. Without either they wait
+    for poll() and iter_pending(), like mido they go to a callback that is
+    set later.
+    """
+
+    def __init__(self, device, name, callback=None):
+        self.device = device
+        self.name = name
+        self.closed = False
+        self._callback = None
+        self._raw_callback = None
+        self._pending = collections.deque()
+        self._callback_lock = threading.RLock()
+        self.callback = callback
+
+    @property
+    def callback(self):
+        return self._callback
+
+    @callback.setter
+    def callback(self, callback):
+        with self._callback_lock:
+            self._raw_callback = None
+            self._callback = callback
+            self._deliver_pending()
+
+    def set_raw_callback(self, callback):
+        """Delivers the raw bytes, used by Controller.listen_raw"""
+        with self._callback_lock:
+            self._raw_callback = callback
+            self._deliver_pending()
+
+    def _deliver_pending(self):
+        if self._raw_callback is None and self._callback is None:
+            return
+        while self._pending:
+            self._deliver(self._pending.popleft())
+
+    def deliver(self, data):
+        if self.closed:
+            return
+        with self._callback_lock:
+            self._deliver(data)
+
+    def _deliver(self, data):
+        if self._raw_callback is not None:
+            self._raw_callback((data, 0.0))
+        elif self._callback is not None:
+            import mido
+            self._callback(mido.Message.from_bytes(data))
+        else:
+            self._pending.append(data)
+
+    def poll(self):
+        """Returns the next waiting mido message, None if there is none"""
+        if not self._pending:
+            return None
+        import mido
+        return mido.Message.from_bytes(self._pending.popleft())
+
+    def iter_pending(self):
+        while self._pending:
+            yield self.poll()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.device.inputs.remove(self)
+
+
+class DeviceEmulator:
+    """Emulated controller of the class device
+
+    Answers the Device Enquiry with the device's product byte after latency
+    seconds (unless answer is False) and keeps the LEDs the controller sets:
+    leds holds note -> (velocity, channel) and rgb note -> (r, g, b) for RGB
+    SysEx. press(), release() and move() send controls to the controller,
+    addressed like its events, e.g. press(APCMini.GridButton, x, y).
+    """
+
+    Device = None
+    PortName = None
+
+    def __init__(self, name=None, firmware=(0, 1, 0, 0), latency=0.0):
+        self.name = name or self.PortName
+        self.product = self.Device.ProductID
+        self.firmware = tuple(firmware)
+        self.latency = latency  # Seconds until the identity reply is sent
+        self.answer = True  # Answer the Device Enquiry
+        self.inputs = []  # Open input ports of this device
+        self.leds = {}  # note -> (velocity, channel)
+        self.rgb = {}  # note -> (r, g, b)
+        self.received = 0  # Messages received from the controller
+        self.enquiries = 0
+        self.sysex = []  # SysEx that is not an enquiry or RGB update
+        self._lock = threading.Lock()
+        self._notes = {entry: number for number, entry in enumerate(self.Device.NoteDecode) if entry is not None}
+        self._controls = {entry: number for number, entry in enumerate(self.Device.ControlDecode) if entry is not None}
+
+    @property
+    def identity(self):
+        """The identity reply to the Device Enquiry"""
+        return bytes([0xF0, 0x7E, 0x00, 0x06, 0x02, 0x47, self.product, 0x00, 0x19, 0x00, *self.firmware, 0xF7])
+
+    def receive(self, data):
+        """Handles a message from the controller"""
+        with self._lock:
+            self.received += 1
+            status = data[0] & 0xF0
+            if status == 0x90 and len(data) == 3:
+                self.leds[data[1]] = (data[2], data[0] & 0x0F)
+            elif status == 0x80 and len(data) == 3:
+                self.leds[data[1]] = (0, data[0] & 0x0F)
+            elif list(data) == self.Device.DeviceEnquiry:
+                self.enquiries += 1
+                if self.answer:
+                    timer = threading.Timer(self.latency, self.inject, [self.identity])
+                    timer.daemon = True
+                    timer.start()
+            elif data[0] == 0xF0:
+                self.receive_sysex(data)
+
+    def receive_sysex(self, data):
+        self.sysex.append(data)
+
+    def inject(self, data):
+        """Sends a raw MIDI message to the controller"""
+        data = bytes(data)
+        for midi_in in list(self.inputs):
+            midi_in.deliver(data)
+
+    def inject_many(self, messages):
+        """Sends raw MIDI messages to the controller, as fast as it takes them"""
+        for data in messages:
+            self.inject(data)
+
+    def note(self, control, *ids):
+        """The note of a button"""
+        return self._notes[(control, ids)]
+
+    def control_number(self, control, *ids):
+        """The control change number of a fader or knob"""
+        return self._controls[(control, ids)]
+
+    def press(self, control, *ids):
+        self.inject((0x90, self.note(control, *ids), 127))
+
+    def release(self, control, *ids):
+        self.inject((0x80, self.note(control, *ids), 0))
+
+    def move(self, control, *ids, value):
+        """Sets a fader or knob to value"""
+        self.inject((0xB0, self.control_number(control, *ids), value))
+
+    def unplug(self):
+        """Closes the ports of the device, see LoopbackBackend.unplug"""
+        for midi_in in list(self.inputs):
+            midi_in.close()
+
+
+class APCMiniEmulator(DeviceEmulator):
+    Device = APCMini
+    PortName = "APC MINI MIDI 1"
+
+
+class APCMinimkiiEmulator(DeviceEmulator):
+    Device = APCMinimkii
+    PortName = "APC mini mk2 Control"
+
+    def receive_sysex(self, data):
+        header = bytes(APCMinimkii.RGBSysExHeader)
+        if not data.startswith(header):
+            super().receive_sysex(data)
+            return
+        body = data[len(header) + 2:-1]  # After the length, before F7
+        for offset in range(0, len(body) - 7, 8):
+            start, end, red_high, red, green_high, green, blue_high, blue = body[offset:offset + 8]
+            colour = ((red_high << 7) | red, (green_high << 7) | green, (blue_high << 7) | blue)
+            for note in range(start, end + 1):
+                self.rgb[note] = colour
+                self.leds.pop(note, None)
+
+
+class MIDIMixEmulator(DeviceEmulator):
+    Device = MIDIMix
+    PortName = "MIDI Mix MIDI 1"
+
+
+class LoopbackBackend:
+    """Port factory whose ports lead to emulated devices, pass it as port_factory
+
+    Has the open_input, open_output and get_*_names functions of mido.
+    Every device has an input and an output port with its name.
+    """
+
+    def __init__(self, *devices):
+        self.devices = {}  # Port name -> DeviceEmulator
+        self._outputs = []
+        for device in devices:
+            self.plug(device)
+
+    def plug(self, device):
+        """Connects a device, its ports show up in the port lists"""
+        self.devices[device.name] = device
+        return device
+
+    def unplug(self, device):
+        """Disconnects a device, its ports are closed and gone from the port lists"""
+        del self.devices[device.name]
+        device.unplug()
+        for midi_out in list(self._outputs):
+            if midi_out.device is device:
+                midi_out.close()
+                self._outputs.remove(midi_out)
+
+    def get_input_names(self):
+        return list(self.devices)
+
+    def get_output_names(self):
+        return list(self.devices)
+
+    def _device(self, name):
+        if name is None and self.devices:
+            name = next(iter(self.devices))  # The default port, like mido
+        if name not in self.devices:
+            raise OSError(f"Unknown port '{name}'")
+        return self.devices[name]
+
+    def open_input(self, name=None, callback=None, **kwargs):
+        device = self._device(name)
+        midi_in = LoopbackInput(device, device.name, callback)
+        device.inputs.append(midi_in)
+        return midi_in
+
+    def open_output(self, name=None, **kwargs):
+        device = self._device(name)
+        midi_out = LoopbackOutput(device, device.name)
+        self._outputs.append(midi_out)
+        return midi_out
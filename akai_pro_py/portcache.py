@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+
+
+def default_path():
+    """ports.json in the user's cache directory"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "akai_pro_py", "ports.json")
+
+
+class PortCache:
+    """JSON file that remembers which device answered the Device Enquiry on which ports
+
+    Entries hold the input and output port names, the product byte and the
+    rest of the identity reply (firmware version and the like). A controller
+    given a cache comes up ready at once when its ports are in it and
+    confirms the entry in the background, see Controller(port_cache=...).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._entries = None  # Loaded on first use, list of dicts
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as file:
+                    self._entries = list(json.load(file)["ports"])
+            except (OSError, ValueError, KeyError, TypeError):  # Missing or unreadable, start over
+                self._entries = []
+        return self._entries
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"ports": self._entries}, file)
+        os.replace(temporary, self.path)  # Other processes never see a half written file
+
+    def get(self, input_name, output_name):
+        """Returns the entry of a pair of ports, None if they are not in the cache"""
+        with self._lock:
+            for entry in self._load():
+                if entry.get("input") == input_name and entry.get("output") == output_name:
+                    return entry
+        return None
+
+    def put(self, input_name, output_name, identity):
+        """Remembers the identity reply (the SysEx data bytes) of a pair of ports"""
+        entry = {"input": input_name, "output": output_name, "product": identity[5], "identity": list(identity)}
+        with self._lock:
+            entries = self._load()
+            entries[:] = [old for old in entries if (old.get("input"), old.get("output")) != (input_name, output_name)]
+            entries.append(entry)
+            self._save()
+
+    def remove(self, input_name, output_name):
+        """Forgets a pair of ports, e.g. because another device answered on them"""
+        with self._lock:
+            entries = self._load()
+            kept = [old for old in entries if (old.get("input"), old.get("output")) != (input_name, output_name)]
+            if len(kept) != len(entries):
+                entries[:] = kept
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._save()
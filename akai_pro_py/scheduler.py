@@ -0,0 +1,174 @@
+import atexit
+import collections
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+_schedulers = weakref.WeakSet()  # Every OutputScheduler, output that is still queued is sent at exit
+
+
+class OutputScheduler:
+    """Sends raw MIDI messages to an output port from a background thread
+
+    Messages are written with the given write function in the order they
+    were queued. Paced messages are spread out so no more than `rate`
+    messages per second go to the device, unpaced messages are sent as fast
+    as the port accepts them.
+
+    A message queued with a key supersedes a message with the same key that
+    is still waiting to be sent (last write wins), only the newest one is
+    written to the port.
+
+    With a wake function the scheduler has no thread of its own, wake() is
+    called whenever messages were queued and the owner calls poll() to send
+    them (see ControllerHub).
+
+    The thread is a daemon, output that is still queued when the interpreter
+    exits is sent for up to ExitTimeout seconds (over all schedulers) first.
+    """
+
+    ExitTimeout = 5.0
+
+    def __init__(self, write, rate=200, wake=None):
+        self.write = write  # Writes one raw MIDI message to the port
+        self.rate = rate  # Messages per second for paced messages, None for no limit
+        self.wake = wake
+        self.sent = 0  # Messages written to the port
+        self.coalesced = 0  # Messages that were superseded by a newer one before they were sent
+        self._queue = collections.deque()  # Items are [message, paced, batch, key]
+        self._latest = {}  # key -> queued item that was not sent yet
+        self._condition = threading.Condition()
+        self._unsent = 0  # Queued messages that were not written to the port yet
+        self._next_slot = 0.0  # Earliest time the next paced message may be sent
+        self._thread = None
+        self._closed = False
+        _schedulers.add(self)
+
+    @property
+    def pending(self):
+        """Number of messages that are queued or currently being sent"""
+        return self._unsent
+
+    def send(self, message, paced=True, key=None):
+        """Queues a single message, returns a future that is done once it was sent"""
+        return self.send_many([message], paced, None if key is None else [key])
+
+    def send_many(self, messages, paced=True, keys=None):
+        """Queues messages in order, returns a future that is done once all were sent
+
+        keys is an optional list with one key (or None) for every message.
+        The result of the future is the number of messages in the batch.
+        """
+        future = Future()
+        messages = list(messages)
+        if not messages:
+            future.set_result(0)
+            return future
+        if keys is None:
+            keys = [None] * len(messages)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Output scheduler is closed")
+            # The batch's future, its size, the first error writing it and the messages still to send
+            batch = [future, len(messages), None, len(messages)]
+            for message, key in zip(messages, keys):
+                item = [message, paced, batch, key]
+                if key is not None:
+                    superseded = self._latest.get(key)
+                    if superseded is not None:
+                        superseded[0] = None  # Skipped when it reaches the front of the queue
+                        self.coalesced += 1
+                    self._latest[key] = item
+                self._queue.append(item)
+                self._unsent += 1
+            if self._thread is None and self.wake is None:
+                self._thread = threading.Thread(target=self._run, name="akai_pro_py output", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        if self.wake is not None:
+            self.wake()
+        return future
+
+    def join(self, timeout=None):
+        """Blocks until every queued message was sent, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._unsent:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self):
+        """Stops the background thread, messages that were not sent yet are dropped"""
+        with self._condition:
+            self._closed = True
+            dropped = list(self._queue)
+            self._queue.clear()
+            self._latest.clear()
+            self._unsent -= len(dropped)
+            self._condition.notify_all()
+        for batch in {id(item[2]): item[2] for item in dropped}.values():
+            batch[0].cancel()
+
+    def poll(self):
+        """Sends the next message if it is due
+
+        Returns 0 when a message was sent, the seconds until the next
+        message is due or None when nothing is queued.
+        """
+        with self._condition:
+            if not self._queue or self._closed:
+                return None
+            item = self._queue[0]
+            message, paced, batch, key = item
+            if message is not None and paced and self.rate:
+                delay = self._next_slot - time.monotonic()
+                if delay > 0:
+                    return delay
+            self._queue.popleft()
+            if key is not None and self._latest.get(key) is item:
+                del self._latest[key]  # From here on a new message for this key is queued again
+        if message is not None:
+            try:
+                self.write(message)
+            except Exception as error:  # Report to whoever waits on this batch instead of killing the thread
+                if batch[2] is None:
+                    batch[2] = error
+            if paced and self.rate:
+                self._next_slot = max(self._next_slot, time.monotonic()) + 1 / self.rate
+        with self._condition:
+            if message is not None:
+                self.sent += 1
+            self._unsent -= 1
+            batch[3] -= 1
+            done = batch[3] == 0
+            self._condition.notify_all()
+        if done:
+            if batch[2] is not None:
+                batch[0].set_exception(batch[2])
+            else:
+                batch[0].set_result(batch[1])
+        return 0
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+            delay = self.poll()
+            if delay:
+                with self._condition:
+                    if not self._closed:
+                        self._condition.wait(delay)  # Woken early by close() or new messages
+
+
+@atexit.register
+def _drain_at_exit():
+    deadline = time.monotonic() + OutputScheduler.ExitTimeout
+    for scheduler in list(_schedulers):
+        scheduler.join(max(deadline - time.monotonic(), 0))
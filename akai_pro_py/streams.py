@@ -0,0 +1,112 @@
+import collections
+import heapq
+import itertools
+
+
+class BufferedStream:
+    """Async iterator over a bounded buffer that is filled on the event loop
+
+    When more than maxsize items are waiting the oldest one is dropped and
+    counted in dropped.
+    """
+
+    def __init__(self, loop, maxsize=256):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.dropped = 0  # Items dropped because the buffer was full
+        self.max_depth = 0  # Most items that were buffered at once
+        self._buffer = collections.deque()
+        self._waiter = None  # Future that __anext__ waits on while the buffer is empty
+        self._closed = False
+
+    def _push(self, item):  # Called on the event loop
+        if self._closed:
+            return
+        if len(self._buffer) >= self.maxsize:
+            self._take()
+            self.dropped += 1
+        self._put(item)
+        self.max_depth = max(self.max_depth, len(self._buffer))
+        self._wake()
+
+    def _put(self, item):
+        self._buffer.append(item)
+
+    def _take(self):
+        return self._buffer.popleft()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._buffer:
+            if self._closed:
+                raise StopAsyncIteration
+            self._waiter = self.loop.create_future()
+            await self._waiter
+        return self._take()
+
+    def close(self):
+        """Stops receiving, iteration ends once the buffered items were taken"""
+        if self._closed:
+            return
+        self._closed = True
+        self.loop.call_soon_threadsafe(self._wake)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class EventStream(BufferedStream):
+    """Async iterator over the events of a controller, see Controller.events()"""
+
+    def __init__(self, controller, loop, control=None, ids=None, maxsize=256):
+        super().__init__(loop, maxsize)
+        self.controller = controller
+        self._handler = self._receive  # Kept to remove the same handler again
+        controller.on_control(control, **(ids or {}))(self._handler)
+
+    def _receive(self, event):  # Called from the MIDI callback or a handler thread
+        self.loop.call_soon_threadsafe(self._push, event)
+
+    def close(self):
+        if not self._closed:
+            self.controller.remove_handler(self._handler)
+        super().close()
+
+
+class MergedEventStream(BufferedStream):
+    """Async iterator over (received time, event) of many controllers, see ControllerHub.events()
+
+    Buffered events are taken in the order they were received, when the
+    buffer is full the earliest event is dropped.
+    """
+
+    def __init__(self, hub, loop, maxsize=256):
+        super().__init__(loop, maxsize)
+        self.hub = hub
+        self._buffer = []  # Heap of (received time, sequence, event)
+        self._sequence = itertools.count()  # Keeps events with the same time in order
+
+    def _put(self, item):
+        received, event = item
+        heapq.heappush(self._buffer, (received, next(self._sequence), event))
+
+    def _take(self):
+        received, _, event = heapq.heappop(self._buffer)
+        return received, event
+
+    def close(self):
+        if not self._closed and self in self.hub.streams:
+            self.hub.streams.remove(self)
+        super().close()
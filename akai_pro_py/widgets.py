@@ -0,0 +1,62 @@
+import time
+
+
+class Meter:
+    """Level meter that shows a 0-127 value on one or more columns of buttons
+
+    columns holds the MIDI notes of each column from bottom to top, on, off
+    and peak are the (velocity, channel) the buttons are set to. Values are
+    mapped to a number of lit buttons through a precomputed 128 entry table.
+    With a peak state the highest level is held for peak_hold seconds and
+    then falls by decay buttons per second. Only buttons that differ from
+    the controller's shadow LED state are sent.
+    """
+
+    def __init__(self, controller, columns, on, off, peak=None, peak_hold=0.5, decay=8.0):
+        self.controller = controller
+        self.columns = [list(column) for column in columns]
+        self.on = on
+        self.off = off
+        self.peak_state = peak
+        self.peak_hold = peak_hold  # Seconds the peak stays before it falls
+        self.decay = decay  # Buttons per second the peak falls after peak_hold
+        self.height = max(len(column) for column in self.columns)
+        self.lut = [round(value * self.height / 127) for value in range(128)]  # MIDI value -> lit buttons
+        self.value = 0
+        self.level = 0
+        self.peak = 0.0
+        self._peak_time = 0.0  # When the peak was last raised
+
+    def update(self, value, now=None):
+        """Shows a new 0-127 value"""
+        self.value = value
+        self.level = self.lut[value]
+        self.tick(now)
+
+    def tick(self, now=None):
+        """Lets the peak fall without a new value, call this regularly when peaks are shown"""
+        now = time.monotonic() if now is None else now
+        if self.level >= self.peak:
+            self.peak = self.level
+            self._peak_time = now
+        else:
+            falling = now - self._peak_time - self.peak_hold
+            if falling > 0:
+                self.peak = max(self.level, self.peak - self.decay * falling)
+                self._peak_time = now - self.peak_hold  # Keep falling from here on the next tick
+        self.draw()
+
+    def draw(self):
+        """Sends the buttons that do not show the current level yet"""
+        peak = int(self.peak + 0.5) if self.peak_state is not None else 0
+        led_state = self.controller.led_state
+        for column in self.columns:
+            for y, note in enumerate(column):
+                if y < self.level:
+                    state = self.on
+                elif y == peak - 1:
+                    state = self.peak_state
+                else:
+                    state = self.off
+                if led_state.get(note) != state:
+                    self.controller.send_led(note, *state)
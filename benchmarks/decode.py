@@ -0,0 +1,80 @@
+"""Micro-benchmark for decoding incoming MIDI messages into controls
+
+Compares the 128 entry decode tables with the linear list searches they
+replaced and times pre_event_dispatch (mido messages) and
+pre_event_dispatch_bytes (raw input) for every kind of control. Needs no
+hardware, run it with `python benchmarks/decode.py`.
+"""
+import os
+import sys
+import timeit
+
+import mido
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from akai_pro_py.APCmini import APCMini  # noqa: E402
+from akai_pro_py.MIDIMix import MIDIMix  # noqa: E402
+
+NUMBER = 200000
+
+
+def linear_grid_xy(button_num):
+    """The nested list.index search APCMini.GridButton used before the decode tables"""
+    for column in APCMini.GridMapping:
+        x = APCMini.GridMapping.index(column)
+        if button_num in column:
+            return x, APCMini.GridMapping[x].index(button_num)
+
+
+def linear_knob_xy(knob_num):
+    """The nested list.index search MIDIMix.Knob used before the decode tables"""
+    for column in MIDIMix.KnobGridMapping:
+        x = MIDIMix.KnobGridMapping.index(column)
+        if knob_num in column:
+            return x, MIDIMix.KnobGridMapping[x].index(knob_num)
+
+
+def offline_controller(cls):
+    """A controller without MIDI ports, enough to call pre_event_dispatch"""
+    controller = cls.__new__(cls)
+    controller.event_dispatch = None
+    controller.button_events = ([None] * 128, [None] * 128)
+    controller.subscriptions = []
+    controller.note_handlers = [()] * 128
+    controller.control_handlers = [()] * 128
+    controller.input_queue = None
+    controller.on_event(lambda event: None)
+    return controller
+
+
+def per_call(statement, number=NUMBER):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    print("Lookup (ns per call)                 linear    table")
+    for name, linear, table, number in [
+        ("APCMini grid button 63", linear_grid_xy, APCMini.GridButton.get_xy_from_button_num, 63),
+        ("MIDIMix knob 58", linear_knob_xy, MIDIMix.Knob.get_knob_xy_from_number, 58),
+    ]:
+        print(f"{name:<35}{per_call(lambda: linear(number)):>8.0f} {per_call(lambda: table(number)):>8.0f}")
+
+    print()
+    print("Dispatch (ns per message)             mido      raw")
+    apc = offline_controller(APCMini)
+    mix = offline_controller(MIDIMix)
+    for name, controller, message in [
+        ("APCMini grid button", apc, mido.Message("note_on", note=63, velocity=127)),
+        ("APCMini side button", apc, mido.Message("note_off", note=89)),
+        ("APCMini fader", apc, mido.Message("control_change", control=56, value=64)),
+        ("MIDIMix knob", mix, mido.Message("control_change", control=58, value=64)),
+        ("MIDIMix mute button", mix, mido.Message("note_on", note=22, velocity=127)),
+    ]:
+        data = message.bytes()
+        print(f"{name:<35}{per_call(lambda: controller.pre_event_dispatch(message)):>8.0f} "
+              f"{per_call(lambda: controller.pre_event_dispatch_bytes(data)):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Import-time benchmark for akai_pro_py
+
+Times each statement in a fresh interpreter and checks which slow modules
+it loaded. A statement that loads a module it must not (e.g. `import
+akai_pro_py` loading mido or asyncio) is a startup regression and makes the
+script exit with status 1, so it can guard CI. Needs no hardware, run it
+with `python benchmarks/import_time.py [runs]`.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SLOW_MODULES = ["mido", "rtmidi", "asyncio", "concurrent.futures", "numpy"]
+
+# (statement, modules it must not load)
+SCENARIOS = [
+    ("import akai_pro_py", SLOW_MODULES + ["akai_pro_py.base_controller"]),
+    ("from akai_pro_py import controllers", SLOW_MODULES + ["akai_pro_py.base_controller"]),
+    # A controller always needs futures and an event loop, mido is only loaded once a port is opened with it
+    ("from akai_pro_py.controllers import MIDIMix", ["mido", "rtmidi", "numpy", "akai_pro_py.APCmini"]),
+    ("from akai_pro_py.controllers import APCMini", ["mido", "rtmidi", "numpy"]),
+    ("from akai_pro_py.controllers import APCMinimkii", ["mido", "rtmidi", "numpy"]),
+    ("from akai_pro_py.controllers import ControllerHub", ["mido", "rtmidi", "numpy"]),
+    ("import mido", []),  # For comparison
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure(statement):
+    """Runs statement in a fresh interpreter, returns (seconds, loaded modules)"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, "-c", PROBE, statement], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output)
+    return result["seconds"], set(result["modules"])
+
+
+def main(runs=5):
+    failed = False
+    print(f"{'Statement':<52}{'median ms':>10}{'min ms':>9}  slow modules loaded")
+    for statement, forbidden in SCENARIOS:
+        times = []
+        for _ in range(runs):
+            seconds, modules = measure(statement)
+            times.append(seconds * 1000)
+        loaded = [name for name in SLOW_MODULES if name in modules]
+        regressions = [name for name in forbidden if name in modules]
+        failed |= bool(regressions)
+        print(f"{statement:<52}{statistics.median(times):>10.1f}{min(times):>9.1f}  {', '.join(loaded) or '-'}"
+              + (f"  REGRESSION: {', '.join(regressions)}" if regressions else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
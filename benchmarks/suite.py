@@ -0,0 +1,237 @@
+"""Benchmark suite for input dispatch and LED output, runs headless against the loopback backend
+
+Measures for the APC mini, APC mini mk2 and MIDI Mix:
+
+* decode rate: messages per second through pre_event_dispatch (mido
+  messages) and pre_event_dispatch_bytes (raw input) for every kind of
+  control, with one handler that does nothing
+* blocks per event: memory blocks still allocated per event after a handler
+  kept every event, i.e. the objects each event costs (0 for buttons,
+  which are reused)
+* LED messages per second: set_led calls alternating between two colours,
+  sent directly and coalesced through the output scheduler, and batches of
+  send_leds without pacing
+* full-grid repaint: time to send an 8x8 frame where every button changes
+* reset duration: time until the future returned by reset() is done, at
+  the default paced output rate
+
+Results are saved as JSON, pass an earlier result file with --compare to
+see the change of every metric:
+
+    python benchmarks/suite.py -o after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+import mido
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from akai_pro_py.loopback import (  # noqa: E402
+    APCMiniEmulator, APCMinimkiiEmulator, LoopbackBackend, MIDIMixEmulator
+)
+
+# Emulator class and (name, MIDI message) of every kind of control of each device
+DEVICES = {
+    "APCMini": (APCMiniEmulator, [
+        ("grid button", mido.Message("note_on", note=63, velocity=127)),
+        ("side button", mido.Message("note_on", note=89, velocity=127)),
+        ("lower button", mido.Message("note_on", note=64, velocity=127)),
+        ("shift button", mido.Message("note_on", note=98, velocity=127)),
+        ("fader", mido.Message("control_change", control=56, value=64)),
+    ]),
+    "APCMinimkii": (APCMinimkiiEmulator, [
+        ("grid button", mido.Message("note_on", note=63, velocity=127)),
+        ("side button", mido.Message("note_on", note=119, velocity=127)),
+        ("lower button", mido.Message("note_on", note=100, velocity=127)),
+        ("shift button", mido.Message("note_on", note=122, velocity=127)),
+        ("fader", mido.Message("control_change", control=56, value=64)),
+    ]),
+    "MIDIMix": (MIDIMixEmulator, [
+        ("knob", mido.Message("control_change", control=58, value=64)),
+        ("fader", mido.Message("control_change", control=19, value=64)),
+        ("mute button", mido.Message("note_on", note=22, velocity=127)),
+        ("rec arm button", mido.Message("note_on", note=24, velocity=127)),
+        ("bank button", mido.Message("note_on", note=26, velocity=127)),
+        ("solo button", mido.Message("note_on", note=27, velocity=127)),
+    ]),
+}
+
+
+def open_device(emulator_class, **kwargs):
+    """A controller connected to an emulated device, returns (controller, emulator)"""
+    emulator = emulator_class()
+    backend = LoopbackBackend(emulator)
+    controller = emulator_class.Device(emulator.name, emulator.name, port_factory=backend, **kwargs)
+    controller.wait_ready(5)
+    return controller, emulator
+
+
+def rate(statement, number):
+    """Calls per second, best of 5"""
+    return number / min(timeit.repeat(statement, number=number, repeat=5))
+
+
+def blocks_per_event(dispatch, count=10000):
+    """Memory blocks kept per event when the handler keeps every event"""
+    kept = [None] * count
+    index = [0]
+
+    def keep(event):
+        kept[index[0]] = event
+        index[0] += 1
+
+    dispatch(keep)  # Warm up, first use of a button creates its reused event
+    index[0] = 0
+    gc.collect()
+    before = sys.getallocatedblocks()
+    for _ in range(count):
+        dispatch(keep)
+    after = sys.getallocatedblocks()
+    return (after - before) / count
+
+
+def bench_decode(number):
+    results = {}
+    for device, (emulator_class, controls) in DEVICES.items():
+        controller, _ = open_device(emulator_class)
+        handler = [lambda event: None]
+        controller.on_event(lambda event: handler[0](event))
+        for name, message in controls:
+            data = message.bytes()
+            handler[0] = lambda event: None
+            results[f"{device} {name}"] = {
+                "mido_messages_per_second": rate(lambda: controller.pre_event_dispatch(message), number),
+                "raw_messages_per_second": rate(lambda: controller.pre_event_dispatch_bytes(data), number),
+                "blocks_per_event": blocks_per_event(
+                    lambda keep: (handler.__setitem__(0, keep), controller.pre_event_dispatch_bytes(data))),
+            }
+            handler[0] = lambda event: None
+    return results
+
+
+def bench_leds(number):
+    results = {}
+    controller, emulator = open_device(APCMiniEmulator, output_rate=None)
+    colours = ["red", "green"]
+    counter = [0]
+
+    def set_led():
+        counter[0] += 1
+        controller.gridbuttons.set_led(3, 4, colours[counter[0] & 1])
+
+    results["APCMini set_led direct"] = {"messages_per_second": rate(set_led, number)}
+
+    controller.coalesce_output = True  # Every update goes through the output scheduler
+    start = time.perf_counter()
+    for _ in range(number):
+        set_led()
+    controller.wait_output()
+    results["APCMini set_led scheduled"] = {
+        "messages_per_second": number / (time.perf_counter() - start),
+        "coalesced": controller.output.coalesced,
+    }
+    controller.coalesce_output = False
+
+    leds = [[(note, colour, 0) for note in range(64)] for colour in (1, 3)]
+    batches = max(number // 64, 1)
+    start = time.perf_counter()
+    for batch in range(batches):
+        controller.send_leds(leds[batch & 1], paced=False)
+    controller.wait_output()
+    results["APCMini send_leds unpaced"] = {"messages_per_second": batches * 64 / (time.perf_counter() - start)}
+
+    frames = [[[colour] * 8 for _ in range(8)] for colour in (1, 3)]
+    repaints = 200
+    start = time.perf_counter()
+    for repaint in range(repaints):
+        controller.gridbuttons.set_frame(frames[repaint & 1])
+    results["APCMini full-grid repaint"] = {"seconds": (time.perf_counter() - start) / repaints}
+
+    mk2, mk2_emulator = open_device(APCMinimkiiEmulator, output_rate=None)
+    frames = [[[colour] * 8 for _ in range(8)] for colour in (5, 21)]
+    start = time.perf_counter()
+    for repaint in range(repaints):
+        mk2.gridbuttons.set_frame(frames[repaint & 1], effects="bright")
+    results["APCMinimkii full-grid repaint"] = {"seconds": (time.perf_counter() - start) / repaints}
+
+    rgb_frames = [[[(x * 16, y * 16, colour) for y in range(8)] for x in range(8)] for colour in (0, 127)]
+    start = time.perf_counter()
+    for repaint in range(repaints):
+        mk2.gridbuttons.set_rgb_frame(rgb_frames[repaint & 1])
+    mk2.wait_output()
+    results["APCMinimkii full-grid RGB repaint"] = {"seconds": (time.perf_counter() - start) / repaints}
+    return results
+
+
+def bench_reset():
+    results = {}
+    for device, (emulator_class, _) in DEVICES.items():
+        controller, emulator = open_device(emulator_class)
+        start = time.perf_counter()
+        controller.reset().result()
+        results[f"{device} reset"] = {"seconds": time.perf_counter() - start, "messages": emulator.received - 1}
+    controller, emulator = open_device(APCMinimkiiEmulator)
+    start = time.perf_counter()
+    controller.reset(fast=True).result()
+    results["APCMinimkii reset fast"] = {"seconds": time.perf_counter() - start, "messages": emulator.received - 1}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    """Prints every metric with its change since the previous results"""
+    for group, benchmarks in results["benchmarks"].items():
+        for name, metrics in benchmarks.items():
+            for metric, value in metrics.items():
+                old = previous.get("benchmarks", {}).get(group, {}).get(name, {}).get(metric)
+                change = f"{(value - old) / old * 100:+7.1f}%" if old else "    new"
+                print(f"{name + ' ' + metric:<70}{value:>14.6g} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=os.path.join(ROOT, "benchmarks", "results.json"),
+                        help="JSON file the results are written to")
+    parser.add_argument("--compare", help="earlier results to compare with")
+    parser.add_argument("-n", "--number", type=int, default=50000, help="calls per timing")
+    arguments = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "benchmarks": {
+            "decode": bench_decode(arguments.number),
+            "leds": bench_leds(arguments.number // 10),
+            "reset": bench_reset(),
+        },
+    }
+    with open(arguments.output, "w") as file:
+        json.dump(results, file, indent=2)
+    previous = {}
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            previous = json.load(file)
+    compare(results, previous)
+    print(f"Results written to {arguments.output}")
+
+
+if __name__ == "__main__":
+    main()
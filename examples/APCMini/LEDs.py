@@ -4,10 +4,12 @@ import time
 # apc = ApcMini(midi_in=None, midi_out=None)
 apc = controllers.APCMini('APC MINI MIDI 1', 'APC MINI MIDI 1')
 
-apc.reset()  # turn off all leds
+apc.reset().result()  # turn off all leds, waits until they are off
 
 for x in range(0, 8):
     for y in range(0, 8):
         apc.gridbuttons.set_led(x, y, "red")
         time.sleep(0.005)
 
+
+apc.wait_output()  # LED updates are sent in the background, wait for them before exiting
@@ -0,0 +1,23 @@
+import asyncio
+
+from akai_pro_py import controllers
+
+
+async def main():
+    # Handlers run on this event loop, next to any other asyncio code
+    apc = controllers.APCMini('APC MINI MIDI 1', 'APC MINI MIDI 1', loop=asyncio.get_running_loop(),
+                              async_dispatch=True)
+    await apc.send_leds_async([(note, 0, 0) for note in range(64)], force=True)  # turn off the grid leds
+
+    @apc.on_grid()
+    async def on_grid_button(event):  # Handlers can be async def functions
+        if event.state:
+            apc.gridbuttons.set_led(event.x, event.y, "yellow_blinking")
+            await asyncio.sleep(1)
+            apc.gridbuttons.set_led(event.x, event.y, "off")
+
+    async for event in apc.events(controllers.APCMini.Fader):  # Or iterate over the events
+        print(f"Fader {event.fader_id} on {event.controller.name} was set to {event.value}!")
+
+
+asyncio.run(main())
@@ -1,31 +1,20 @@
 from akai_pro_py import controllers
-from scipy.interpolate import interp1d
-from mido import get_output_names
-from re import match
 
-def get_midi_port(search) -> str:
-    for port in get_output_names():
-        matching = match(search, port)
-        if matching:
-            return matching.group()
+# Asks every MIDI port at once which device it is, so the port names do not
+# have to be known
+found = {type(device): device for device in controllers.discover()}
+apc = found[controllers.APCMinimkii]
+midi_mix = found[controllers.MIDIMix]
 
-# Names may change for your system
-# probe for names using mido.get_output_names()
-# or mido.get_input_names()
-apc = controllers.APCMinimkii(
-    get_midi_port(r"^APC.*?Contr.*$"),
-    get_midi_port(r"^APC.*?Contr.*$")
-)
-midi_mix = controllers.MIDIMix(
-    get_midi_port(r"MIDI Mix.*?$"),
-    get_midi_port(r"MIDI Mix.*?$")
-)
+apc.reset().result()  # turn off all leds, waits until they are off
+midi_mix.reset().result()  # reset midi_mix
 
-apc.reset()  # turn off all leds
-midi_mix.reset()  # reset midi_mix
-
-# Creates a map from the 7 bit values of MIDI to a 3 bit value for display
-midi_to_led = interp1d([0, 127], [0, 7])
+# One level meter per fader on its grid column, with a green peak that is
+# held for half a second before it falls
+meters = [
+    apc.meter([column], "blue", peak_colour="green", effect="pulse")
+    for column in range(8)
+]
 
 
 # Defines this function for recieving button presses/fader changes
@@ -60,28 +49,9 @@ def on_control_event(event):
         # Ignore fader ID 8 (the master fader)
         if event.fader_id == 8:
             return
-        # Map the MIDI value (0,127) to 3 bit (0,7)
-        value = int(midi_to_led(event.value))
         print(event.value)
-        print(value)
-        if event.value == 0:  # If the value is 0 (fader at minimum)
-            for i in range(0, 8):
-                # Set all LEDs in the column to off
-                apc.gridbuttons.set_led(event.fader_id, i, "off", 0)
-        else:
-            # Go through all the LEDs that should be on
-            for i in range(0, value + 1):
-                # and set them to green
-                if event.value == 127:
-                    apc.gridbuttons.set_led(
-                        event.fader_id, i, "green", "blink"
-                    )
-                else:
-                    apc.gridbuttons.set_led(event.fader_id, i, "blue", "pulse")
-            # Go through all the LEDs that should be off
-            for i in range(value + 1, 8):
-                # and set them to off
-                apc.gridbuttons.set_led(event.fader_id, i, "off", 0)
+        # Only the buttons that change between levels are sent
+        meters[event.fader_id].update(event.value)
 
 
 @midi_mix.on_event
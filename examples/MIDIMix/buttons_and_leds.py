@@ -5,7 +5,7 @@ from akai_pro_py import controllers
 # second argument: MIDI out
 midi_mix = controllers.MIDIMix('MIDI Mix MIDI 1', 'MIDI Mix MIDI 1')
 
-midi_mix.reset()
+midi_mix.reset().result()
 
 
 @midi_mix.on_event
@@ -1,18 +1,25 @@
 from akai_pro_py import controllers
-from scipy.interpolate import interp1d
 
 
+# Both controllers share one event loop and one output thread
+hub = controllers.ControllerHub()
+
 # Define the MIDI Mix and APC Mini
-# first argument: MIDI in
-# second argument: MIDI out
-midi_mix = controllers.MIDIMix('MIDI Mix MIDI 1', 'MIDI Mix MIDI 1')
-apc = controllers.APCMini('APC MINI MIDI 1', 'APC MINI MIDI 1')
+# first argument: controller class
+# second argument: MIDI in
+# third argument: MIDI out
+midi_mix = hub.open(controllers.MIDIMix, 'MIDI Mix MIDI 1', 'MIDI Mix MIDI 1')
+# Fader sweeps repaint whole columns, only send the latest state of each LED
+apc = hub.open(
+    controllers.APCMini, 'APC MINI MIDI 1', 'APC MINI MIDI 1',
+    coalesce_output=True
+)
 
-# Creates a map from the 7 bit values of MIDI to a 3 bit value for display
-midi_to_led = interp1d([0, 127], [0, 7])
+# One level meter per fader, showing the fader value on its grid column
+meters = [apc.meter([column]) for column in range(8)]
 
-apc.reset()  # turn off all leds
-midi_mix.reset()
+apc.reset().result()  # turn off all leds, waits until they are off
+midi_mix.reset().result()
 
 
 @midi_mix.on_event
@@ -76,25 +83,8 @@ def on_event_apc_mini(event):  # Register event function
     elif isinstance(event, controllers.APCMini.Fader):
         if event.fader_id == 8:  # Ignore fader ID 8 (the master fader)
             return
-        # Map the MIDI value (0,127) to 3 bit (0,7)
-        value = int(midi_to_led(event.value))
-        if value == 0:  # If the value is 0 (fader at minimum)
-            for i in range(0, 8):
-                # Set all LEDs in the column to off
-                apc.gridbuttons.set_led(event.fader_id, i, "off")
-        elif value == 7:  # If the value is 7 (fader at maximum)
-            for i in range(0, 8):
-                # Set all LEDs in column to green
-                apc.gridbuttons.set_led(event.fader_id, i, "green")
-        else:
-            # Go through all the LEDs that should be on
-            for i in range(0, value):
-                # and set them to green
-                apc.gridbuttons.set_led(event.fader_id, i, "green")
-            # Go through all the LEDs that should be off
-            for i in range(value+1, 8):
-                # and set them to off
-                apc.gridbuttons.set_led(event.fader_id, i, "off")
+        # Only the buttons that change between two levels are sent
+        meters[event.fader_id].update(event.value)
 
 
-midi_mix.start()  # Start event loop
+hub.start()  # Start the event loop of both controllers
@@ -13,6 +13,7 @@ setup(
                       'python-rtmidi',
                       'asyncio'
                       ],
+    extras_require={'numpy': ['numpy']},
 
     classifiers=[
         'Development Status :: 3 - Alpha',
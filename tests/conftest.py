@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from akai_pro_py.loopback import LoopbackBackend  # noqa: E402
+from akai_pro_py.portcache import PortCache  # noqa: E402
+
+
+@pytest.fixture
+def connect():
+    """Connects a controller (the emulator's device unless given) to an emulated device
+
+    Returns (controller, emulator, backend).
+    """
+    opened = []
+
+    def connect(emulator, device=None, backend=None, **kwargs):
+        backend = backend or LoopbackBackend(emulator)
+        controller = (device or emulator.Device)(emulator.name, emulator.name, port_factory=backend, **kwargs)
+        opened.append(controller)
+        return controller, emulator, backend
+
+    yield connect
+    for controller in opened:
+        controller.output.close()
+        controller.disconnect()
+
+
+@pytest.fixture
+def port_cache(tmp_path):
+    return PortCache(str(tmp_path / "ports.json"))
@@ -0,0 +1,62 @@
+import pytest
+
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.APCminimkii import APCMinimkii
+from akai_pro_py.base_controller import Controller
+from akai_pro_py.loopback import APCMiniEmulator, APCMinimkiiEmulator, MIDIMixEmulator
+from akai_pro_py.MIDIMix import MIDIMix
+
+Emulators = [APCMiniEmulator, APCMinimkiiEmulator, MIDIMixEmulator]
+
+
+def ids_of(event):
+    """The ids of an event, its slots between the controller and the state or value"""
+    return tuple(getattr(event, name) for name in event.__slots__[1:-1])
+
+
+@pytest.mark.parametrize("emulator_class", Emulators)
+def test_every_note_decodes_to_its_button(connect, emulator_class):  # user-010
+    controller, emulator, _ = connect(emulator_class(), raw_input=True)
+    controller.wait_ready(1)
+    seen = []
+    controller.on_control(None)(seen.append)
+    entries = [(note, entry) for note, entry in enumerate(controller.NoteDecode) if entry is not None]
+    for note, entry in entries:
+        emulator.inject((0x90, note, 127))
+        emulator.inject((0x80, note, 0))
+    assert [(type(event), ids_of(event), event.state) for event in seen] == [
+        (control, ids, state) for note, (control, ids) in entries for state in (True, False)
+    ]
+
+
+@pytest.mark.parametrize("emulator_class", Emulators)
+def test_every_control_decodes_to_its_fader_or_knob(connect, emulator_class):  # user-010
+    controller, emulator, _ = connect(emulator_class())
+    controller.wait_ready(1)
+    seen = []
+    controller.on_control(None)(seen.append)
+    entries = [(number, entry) for number, entry in enumerate(controller.ControlDecode) if entry is not None]
+    for number, entry in entries:
+        emulator.inject((0xB0, number, number))
+    assert [(type(event), ids_of(event), event.value) for event in seen] == [
+        (control, ids, number) for number, (control, ids) in entries
+    ]
+
+
+def test_unknown_numbers_are_ignored(connect):  # user-010
+    apc, emulator, _ = connect(APCMiniEmulator(), raw_input=True)
+    apc.wait_ready(1)
+    seen = []
+    apc.on_control(None)(seen.append)
+    unused = APCMini.NoteDecode.index(None)
+    emulator.inject((0x90, unused, 127))
+    emulator.inject((0xB0, APCMini.ControlDecode.index(None), 1))
+    assert seen == []
+
+
+def test_decode_ids():  # user-010
+    assert Controller.decode_ids(APCMini.NoteDecode, APCMini.GridMapping[2][7], APCMini.GridButton) == (2, 7)
+    assert Controller.decode_ids(APCMini.NoteDecode, APCMini.GridMapping[2][7], APCMini.SideButton) is None
+    assert Controller.decode_ids(APCMinimkii.NoteDecode, 128, APCMinimkii.GridButton) is None
+    assert Controller.decode_ids(MIDIMix.ControlDecode, MIDIMix.KnobGridMapping[1][2], MIDIMix.Knob) == (1, 2)
+    assert APCMini.GridButton.get_xy_from_button_num(APCMini.GridMapping[5][1]) == (5, 1)
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.APCminimkii import APCMinimkii
+from akai_pro_py.discovery import discover, pair_ports
+from akai_pro_py.loopback import APCMiniEmulator, APCMinimkiiEmulator, LoopbackBackend, MIDIMixEmulator
+from akai_pro_py.MIDIMix import MIDIMix
+
+
+@pytest.fixture
+def discovered():
+    """Runs discover() and disconnects the controllers it found afterwards"""
+    found = []
+
+    def run(*args, **kwargs):
+        controllers = discover(*args, **kwargs)
+        found.extend(controllers)
+        return controllers
+
+    yield run
+    for controller in found:
+        controller.output.close()
+        controller.disconnect()
+
+
+def test_discover_finds_every_device(discovered):  # user-019
+    emulators = [APCMiniEmulator(), APCMinimkiiEmulator(), MIDIMixEmulator()]
+    silent = APCMiniEmulator("Some synth")
+    silent.answer = False
+    backend = LoopbackBackend(*emulators, silent)
+    start = time.monotonic()
+    controllers = discovered(0.5, port_factory=backend)
+    elapsed = time.monotonic() - start
+    assert sorted(type(controller).__name__ for controller in controllers) == ["APCMini", "APCMinimkii", "MIDIMix"]
+    assert all(emulator.enquiries == 1 for emulator in emulators + [silent])  # Asked once, not again by the controller
+    assert silent.inputs == []  # The port that did not answer is closed
+    assert 0.5 <= elapsed < 1.5  # Waited for the silent port, but only once
+
+
+def test_discover_returns_once_every_port_answered(discovered):  # user-019
+    emulators = [APCMiniEmulator(), APCMinimkiiEmulator(), MIDIMixEmulator()]
+    start = time.monotonic()
+    controllers = discovered(5, port_factory=LoopbackBackend(*emulators))
+    assert time.monotonic() - start < 1
+    assert len(controllers) == 3
+
+
+def test_discovered_controllers_are_ready(discovered):  # user-019
+    apc_emulator, mix_emulator = APCMiniEmulator(), MIDIMixEmulator()
+    controllers = discovered(1, port_factory=LoopbackBackend(apc_emulator, mix_emulator))
+    apc = next(controller for controller in controllers if isinstance(controller, APCMini))
+    assert apc.wait_ready(0)
+    apc.gridbuttons.set_led(0, 0, "red")
+    assert apc_emulator.leds[APCMini.GridMapping[0][0]] == (3, 0)
+    seen = []
+    mix = next(controller for controller in controllers if isinstance(controller, MIDIMix))
+    mix.on_solo()(seen.append)
+    mix_emulator.press(MIDIMix.SoloButton)
+    assert len(seen) == 1
+
+
+def test_discover_only_given_ports(discovered):  # user-019
+    backend = LoopbackBackend(APCMiniEmulator(), APCMinimkiiEmulator())
+    name = APCMinimkiiEmulator.PortName
+    controllers = discovered(1, ports=[(name, name)], port_factory=backend)
+    assert [type(controller) for controller in controllers] == [APCMinimkii]
+
+
+def test_pair_ports_ignores_backend_numbers():  # user-019
+    assert pair_ports(["APC MINI 0", "MIDI Mix 1"], ["MIDI Mix 2", "APC MINI 3", "Other"]) == [
+        ("MIDI Mix 1", "MIDI Mix 2"), ("APC MINI 0", "APC MINI 3")
+    ]
@@ -0,0 +1,33 @@
+import pytest
+
+from akai_pro_py.loopback import APCMiniEmulator
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def apc(connect):
+    apc, emulator, _ = connect(APCMiniEmulator(), output_rate=None)
+    apc.wait_ready(1)
+    return apc
+
+
+def test_flush_sends_changed_buttons(apc):  # user-008
+    grid = apc.grid_state()
+    grid.fill(1)
+    assert grid.flush() == 64
+    assert grid.flush() == 0
+    grid.fill_row(0, 3)
+    assert grid.flush() == 8
+
+
+def test_flush_repaints_leds_changed_elsewhere(apc):  # user-008
+    grid = apc.grid_state()
+    grid.fill(1)
+    grid.flush()
+    apc.gridbuttons.set_led(0, 0, "red")
+    assert grid.flush() == 1
+    apc.reset().result(1)
+    assert grid.flush() == 64
+    apc.invalidate_leds()
+    assert grid.flush() == 64
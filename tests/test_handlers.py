@@ -0,0 +1,48 @@
+import pytest
+
+from akai_pro_py import errors
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.loopback import APCMiniEmulator, MIDIMixEmulator
+from akai_pro_py.MIDIMix import MIDIMix
+
+
+def test_on_grid_routes_by_column(connect):  # user-014
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    column, everything = [], []
+    apc.on_grid(x=3)(column.append)
+    apc.on_control(None)(everything.append)
+    emulator.press(APCMini.GridButton, 3, 0)
+    emulator.press(APCMini.GridButton, 4, 0)
+    emulator.move(APCMini.Fader, 3, value=10)
+    assert [(event.x, event.y) for event in column] == [(3, 0)]
+    assert [type(event) for event in everything] == [APCMini.GridButton, APCMini.GridButton, APCMini.Fader]
+
+
+def test_on_knob_routes_by_row(connect):  # user-014
+    mix, emulator, _ = connect(MIDIMixEmulator())
+    mix.wait_ready(1)
+    seen = []
+    mix.on_knob(row=1)(seen.append)
+    for row in range(3):
+        emulator.move(MIDIMix.Knob, 2, row, value=row)
+    assert [(event.x, event.y, event.value) for event in seen] == [(2, 1, 1)]
+
+
+def test_remove_handler(connect):  # user-014
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    seen = []
+    handler = apc.on_shift()(seen.append)
+    emulator.press(APCMini.ShiftButton)
+    apc.remove_handler(handler)
+    emulator.press(APCMini.ShiftButton)
+    assert len(seen) == 1
+
+
+def test_on_control_rejects_unknown_ids(connect):  # user-014
+    apc, _, _ = connect(APCMiniEmulator())
+    with pytest.raises(errors.AkaiProPyError):
+        apc.on_control(APCMini.GridButton, button_id=1)
+    with pytest.raises(errors.AkaiProPyError):
+        apc.on_control(None, x=1)
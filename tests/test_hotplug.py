@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from akai_pro_py import errors
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.hotplug import HotplugMonitor
+from akai_pro_py.loopback import APCMiniEmulator
+
+
+def test_reconnect_restores_leds(connect):  # user-022
+    apc, emulator, backend = connect(APCMiniEmulator(), output_rate=None)
+    apc.wait_ready(1)
+    apc.gridbuttons.set_led(1, 2, "red")
+    monitor = HotplugMonitor([apc])
+
+    backend.unplug(emulator)
+    assert monitor.poll() == []
+    assert not apc.connected
+    apc.gridbuttons.set_led(3, 4, "green")  # Only changes the shadow LED state while unplugged
+
+    replugged = backend.plug(APCMiniEmulator())
+    assert monitor.poll() == [apc]
+    apc.wait_ready(1)
+    apc.wait_output(1)
+    assert replugged.leds == {
+        APCMini.GridMapping[1][2]: (APCMini.GridColours["red"], 0),
+        APCMini.GridMapping[3][4]: (APCMini.GridColours["green"], 0),
+    }
+    assert (monitor.disconnects, monitor.reconnects) == (1, 1)
+
+
+def test_unplug_during_identification_fails_ready(connect):  # user-022
+    emulator = APCMiniEmulator()
+    emulator.answer = False
+    apc, _, backend = connect(emulator, identify_timeout=0.05, identify_retries=3)
+    backend.unplug(emulator)
+    apc.disconnect()
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(1)
+    time.sleep(0.1)  # No retry is sent to the closed port
+    assert emulator.enquiries == 1
+
+
+def test_closed_port_fails_identification(connect):  # user-022
+    emulator = APCMiniEmulator()
+    emulator.answer = False
+    apc, _, backend = connect(emulator, identify_timeout=0.05, identify_retries=3)
+    backend.unplug(emulator)  # The ports close before the hot-plug monitor noticed
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(1)
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from akai_pro_py import errors
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.APCminimkii import APCMinimkii
+from akai_pro_py.loopback import APCMiniEmulator, MIDIMixEmulator
+
+
+def test_ready_once_identified(connect):  # user-021
+    apc, emulator, _ = connect(APCMiniEmulator())
+    assert apc.wait_ready(1) is apc
+    assert emulator.enquiries == 1
+    assert apc.identity[5] == APCMini.ProductID
+
+
+def test_wrong_device_fails(connect):  # user-021
+    apc, _, _ = connect(MIDIMixEmulator(), device=APCMini)
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(1)
+
+
+def test_timeout_after_retries(connect):  # user-021
+    emulator = APCMiniEmulator()
+    emulator.answer = False
+    apc, _, _ = connect(emulator, identify_timeout=0.05, identify_retries=2)
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(1)
+    assert emulator.enquiries == 3
+
+
+def test_late_answer_recovers(connect):  # user-021
+    apc, _, _ = connect(APCMiniEmulator(latency=0.2), identify_timeout=0.05, identify_retries=0)
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(1)
+    time.sleep(0.3)
+    assert apc.wait_ready(1) is apc
+
+
+@pytest.mark.parametrize("raw_input", [False, True])
+def test_early_input_is_replayed(connect, raw_input):  # user-021
+    apc, emulator, _ = connect(APCMiniEmulator(latency=0.1), raw_input=raw_input)
+    seen = []
+    apc.on_event(seen.append)
+    emulator.press(APCMini.GridButton, 3, 4)
+    emulator.move(APCMini.Fader, 2, value=64)
+    assert not apc.ready.done()
+    apc.wait_ready(1)
+    assert [type(event) for event in seen] == [APCMini.GridButton, APCMini.Fader]
+    assert (seen[0].x, seen[0].y, seen[1].value) == (3, 4, 64)
+
+
+def test_cached_identity_is_ready_at_once(connect, port_cache):  # user-023
+    emulator = APCMiniEmulator(latency=0.1)
+    port_cache.put(emulator.name, emulator.name, bytes(emulator.identity[1:-1]))
+    apc, _, _ = connect(emulator, port_cache=port_cache)
+    assert apc.ready.done()
+    assert apc.confirmed.result(1) is apc
+
+
+def test_stale_cache_entry(connect, port_cache):  # user-023
+    apc_emulator = APCMiniEmulator()
+    port_cache.put(apc_emulator.name, apc_emulator.name, bytes(apc_emulator.identity[1:-1]))
+    mix = MIDIMixEmulator(name=apc_emulator.name)  # Another device is now on the cached ports
+    apc, _, _ = connect(mix, device=APCMini, port_cache=port_cache)
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.confirmed.result(1)
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(0)
+    assert port_cache.get(apc_emulator.name, apc_emulator.name) is None
+
+
+def test_slow_cached_device_recovers(connect, port_cache):  # user-023
+    emulator = APCMiniEmulator(latency=0.3)
+    port_cache.put(emulator.name, emulator.name, bytes(emulator.identity[1:-1]))
+    apc, _, _ = connect(emulator, port_cache=port_cache, identify_timeout=0.1, identify_retries=0)
+    seen = []
+    apc.on_event(seen.append)
+    time.sleep(0.15)  # The confirmation timed out, the controller identifies the device again
+    emulator.press(APCMini.GridButton, 1, 1)
+    time.sleep(0.3)
+    assert apc.wait_ready(1) is apc
+    assert apc.confirmed.result(1) is apc
+    emulator.press(APCMini.GridButton, 2, 2)
+    assert [(event.x, event.y) for event in seen] == [(1, 1), (2, 2)]
+    assert port_cache.get(emulator.name, emulator.name) is not None
+
+
+def test_on_ready_after_late_answer(connect):  # user-023
+    apc, _, _ = connect(APCMiniEmulator(latency=0.2), identify_timeout=0.05, identify_retries=0)
+    called = threading.Event()
+    apc.on_ready(called.set)
+    with pytest.raises(errors.ControllerIdentificationError):
+        apc.wait_ready(1)
+    assert called.wait(1)
+    assert apc.wait_ready(0) is apc
+
+
+def test_mk2_rejects_other_akai_device(connect):  # user-021
+    mk2, _, _ = connect(APCMiniEmulator(), device=APCMinimkii)
+    with pytest.raises(errors.ControllerIdentificationError, match="mk2"):
+        mk2.wait_ready(1)
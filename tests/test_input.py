@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from akai_pro_py import errors
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.hub import ControllerHub
+from akai_pro_py.loopback import APCMiniEmulator, LoopbackBackend
+
+
+def blocking_handler():
+    """A handler that blocks on its first event until released, returns (handler, started, release, seen)"""
+    started = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def handler(event):
+        started.set()
+        release.wait(1)
+        seen.append(event)
+    return handler, started, release, seen
+
+
+def test_coalesce_input_keeps_latest_value(connect):  # user-013
+    apc, emulator, _ = connect(APCMiniEmulator(), coalesce_input=True)
+    apc.wait_ready(1)
+    handler, started, release, seen = blocking_handler()
+    apc.on_fader()(handler)
+    emulator.move(APCMini.Fader, 0, value=0)
+    assert started.wait(1)
+    for value in range(1, 11):  # Arrive while the handler is busy with the first value
+        emulator.move(APCMini.Fader, 0, value=value)
+    release.set()
+    apc.input_queue.join(1)
+    assert [event.value for event in seen] == [0, 10]
+    assert apc.dropped_input == 9
+
+
+def test_input_capacity_drops_oldest(connect):  # user-017
+    apc, emulator, _ = connect(APCMiniEmulator(), input_capacity=2)
+    apc.wait_ready(1)
+    handler, started, release, seen = blocking_handler()
+    apc.on_grid()(handler)
+    emulator.press(APCMini.GridButton, 0, 0)
+    assert started.wait(1)
+    for x in range(1, 6):
+        emulator.press(APCMini.GridButton, x, 0)
+    release.set()
+    apc.input_queue.join(1)
+    assert [event.x for event in seen] == [0, 4, 5]
+    assert apc.overflowed_input == 3
+    assert apc.input_stats()["max_depth"] == 2
+
+
+def test_handler_workers_keep_each_control_in_order(connect):  # user-015
+    apc, emulator, _ = connect(APCMiniEmulator(), handler_workers=4)
+    apc.wait_ready(1)
+    handler, started, release, seen = blocking_handler()
+    other = []
+    other_done = threading.Event()
+
+    def other_handler(event):
+        other.append(event.value)
+        if len(other) == 21:
+            other_done.set()
+    apc.on_fader(0)(handler)
+    apc.on_fader(1)(other_handler)
+    emulator.move(APCMini.Fader, 0, value=0)
+    assert started.wait(1)
+    for value in range(1, 21):
+        emulator.move(APCMini.Fader, 0, value=value)
+        emulator.move(APCMini.Fader, 1, value=value - 1)
+    emulator.move(APCMini.Fader, 1, value=20)
+    assert other_done.wait(1)  # Not held up by the busy worker of fader 0
+    release.set()
+    assert apc.input_queue.join(1)
+    assert [event.value for event in seen] == list(range(21))
+    assert other == list(range(21))
+
+
+def test_hub_refuses_own_input_handling():  # user-018
+    emulator = APCMiniEmulator()
+    hub = ControllerHub()
+    with pytest.raises(errors.AkaiProPyError):
+        hub.open(APCMini, emulator.name, emulator.name, port_factory=LoopbackBackend(emulator), handler_workers=4)
+    assert not emulator.inputs  # The ports of the controller were closed again
+    hub.close()
+    hub.loop.close()
+
+
+def test_hub_handlers_run_on_its_loop():  # user-018
+    emulator = APCMiniEmulator()
+    hub = ControllerHub()
+    apc = hub.open(APCMini, emulator.name, emulator.name, port_factory=LoopbackBackend(emulator))
+    apc.wait_ready(1)
+    seen = []
+    apc.on_grid()(lambda event: (seen.append(event), hub.loop.stop()))
+    emulator.press(APCMini.GridButton, 1, 2)
+    assert not seen  # Waits for the loop
+    hub.loop.run_forever()
+    assert [(event.x, event.y) for event in seen] == [(1, 2)]
+
+    hub.remove(apc)
+    assert apc.loop is not hub.loop
+    emulator.press(APCMini.GridButton, 2, 3)  # Handled on the MIDI callback again
+    assert len(seen) == 2
+    apc.loop.close()
+    hub.close()
+    hub.loop.close()
+
+
+def test_hub_remove_gives_loop_back(connect):  # user-018
+    apc, _, _ = connect(APCMiniEmulator())
+    own_loop = apc.loop
+    hub = ControllerHub()
+    hub.add(apc)
+    assert apc.loop is hub.loop
+    hub.remove(apc)
+    assert apc.loop is own_loop
+    own_loop.close()
+    hub.close()
+    hub.loop.close()
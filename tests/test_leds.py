@@ -0,0 +1,160 @@
+import pytest
+
+from akai_pro_py import APCmini, APCminimkii
+from akai_pro_py.APCmini import APCMini
+from akai_pro_py.APCminimkii import APCMinimkii
+from akai_pro_py.loopback import APCMiniEmulator, APCMinimkiiEmulator
+
+
+def test_unchanged_led_is_not_sent(connect):  # user-001
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    note = APCMini.GridMapping[2][5]
+    assert apc.send_led(note, 1)
+    assert not apc.send_led(note, 1)
+    apc.gridbuttons.set_led(2, 5, "green")  # Same velocity through the control
+    assert emulator.received == 1 + 1  # Device Enquiry, one LED
+    assert emulator.leds[note] == (1, 0)
+
+
+def test_force_sends_unchanged_led(connect):  # user-001
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    apc.gridbuttons.set_led(0, 0, "red")
+    apc.gridbuttons.set_led(0, 0, "red", force=True)
+    assert emulator.received == 1 + 2
+
+
+def test_invalidate_leds_sends_next_update(connect):  # user-001
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    apc.gridbuttons.set_led(0, 0, "red")
+    emulator.leds.clear()  # E.g. the device was power cycled
+    apc.invalidate_leds()
+    assert apc.led_state == {}
+    apc.gridbuttons.set_led(0, 0, "red")
+    assert emulator.leds[APCMini.GridMapping[0][0]] == (3, 0)
+    assert emulator.received == 1 + 2
+
+
+def test_send_leds_skips_unchanged(connect):  # user-001
+    apc, emulator, _ = connect(APCMiniEmulator(), output_rate=None)
+    apc.wait_ready(1)
+    leds = [(note, 5, 0) for note in range(8)]
+    apc.send_leds(leds).result(1)
+    assert apc.send_leds(leds).result(1) == 0
+    assert emulator.received == 1 + 8
+
+
+def test_set_frame_sends_changed_leds(connect):  # user-002
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    frame = [["red"] * 8 for _ in range(8)]
+    assert apc.gridbuttons.set_frame(frame) == 64
+    frame[3][4] = "green"
+    assert apc.gridbuttons.set_frame(frame) == 1
+    assert apc.gridbuttons.set_frame(frame) == 0
+    assert apc.gridbuttons.set_frame(frame, force=True) == 64
+    assert emulator.leds[APCMini.GridMapping[3][4]] == (1, 0)
+    assert emulator.received == 1 + 64 + 1 + 64
+
+
+@pytest.mark.parametrize("frame, error", [
+    ([["red"] * 8 for _ in range(7)], APCmini.InvalidGridButton),
+    ([["red"] * 8 for _ in range(7)] + [["red"] * 7], APCmini.InvalidGridButton),
+    ([["red"] * 8 for _ in range(7)] + [["red"] * 7 + ["purple"]], APCmini.InvalidButtonColour),
+    ([["red"] * 8 for _ in range(7)] + [["red"] * 7 + [7]], APCmini.InvalidButtonColour),
+])
+def test_set_frame_validates_before_sending(connect, frame, error):  # user-002
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    with pytest.raises(error):
+        apc.gridbuttons.set_frame(frame)
+    assert emulator.received == 1
+    assert apc.led_state == {}
+
+
+def test_mk2_set_frame_with_effects(connect):  # user-002
+    mk2, emulator, _ = connect(APCMinimkiiEmulator())
+    mk2.wait_ready(1)
+    frame = [[5] * 8 for _ in range(8)]
+    effects = [["bright"] * 8 for _ in range(8)]
+    effects[1][2] = "blink"
+    assert mk2.gridbuttons.set_frame(frame, effects) == 64
+    assert mk2.gridbuttons.set_frame(frame) == 1  # Only the blinking button changes
+    note = APCMinimkii.GridMapping[1][2]
+    assert emulator.leds[note] == (5, APCMinimkii.GridEffects["bright"])
+    with pytest.raises(APCminimkii.InvalidButtonEffect):
+        mk2.gridbuttons.set_frame(frame, "sparkle")
+    with pytest.raises(APCminimkii.InvalidGridButton):
+        mk2.gridbuttons.set_frame(frame, effects[:7])
+    with pytest.raises(APCminimkii.InvalidButtonColour):
+        mk2.gridbuttons.set_frame([[128] * 8 for _ in range(8)])
+
+
+def record_sysex(emulator):
+    """Keeps every RGB SysEx the emulator receives in the returned list"""
+    sysex = []
+    receive_sysex = emulator.receive_sysex
+
+    def record(data):
+        sysex.append(data)
+        receive_sysex(data)
+    emulator.receive_sysex = record
+    return sysex
+
+
+def ranges(data):
+    """Number of ranges in an RGB SysEx"""
+    return (len(data) - len(APCMinimkii.RGBSysExHeader) - 3) // 8
+
+
+def test_rgb_frame_merges_neighbours(connect):  # user-006
+    mk2, emulator, _ = connect(APCMinimkiiEmulator())
+    mk2.wait_ready(1)
+    sysex = record_sysex(emulator)
+    assert mk2.gridbuttons.set_rgb_frame([[0xFF8000] * 8 for _ in range(8)]) == 1
+    assert [ranges(data) for data in sysex] == [1]
+    assert emulator.rgb == {note: (255, 128, 0) for note in range(64)}
+    assert mk2.gridbuttons.set_rgb_frame([[(255, 128, 0)] * 8 for _ in range(8)]) == 0
+
+
+def test_rgb_frame_packs_ranges_in_one_sysex(connect):  # user-006
+    mk2, emulator, _ = connect(APCMinimkiiEmulator())
+    mk2.wait_ready(1)
+    sysex = record_sysex(emulator)
+    row = [[(x & 1) * 0xFFFFFF] for x in range(8)]  # Alternating on the bottom row
+    assert mk2.gridbuttons.set_rgb_frame(row) == 1
+    assert [ranges(data) for data in sysex] == [8]
+    assert emulator.rgb[APCMinimkii.GridMapping[1][0]] == (255, 255, 255)
+    assert emulator.rgb[APCMinimkii.GridMapping[2][0]] == (0, 0, 0)
+    mk2.gridbuttons.set_rgb(2, 0, 0x000000)  # Already black
+    mk2.gridbuttons.set_rgb(2, 0, 0x0000FF)
+    assert [ranges(data) for data in sysex] == [8, 1]
+    assert emulator.rgb[APCMinimkii.GridMapping[2][0]] == (0, 0, 255)
+
+
+def test_rgb_and_note_leds_replace_each_other(connect):  # user-006
+    mk2, emulator, _ = connect(APCMinimkiiEmulator())
+    mk2.wait_ready(1)
+    note = APCMinimkii.GridMapping[0][0]
+    mk2.gridbuttons.set_led(0, 0, 5, "bright")
+    mk2.gridbuttons.set_rgb(0, 0, 0x123456)
+    assert note not in emulator.leds
+    mk2.gridbuttons.set_led(0, 0, 5, "bright")  # Sent again, the RGB colour replaced it
+    assert emulator.leds[note] == (5, APCMinimkii.GridEffects["bright"])
+    assert mk2.gridbuttons.set_rgb_frame([[0x123456]]) == 1
+
+
+@pytest.mark.parametrize("frame, x, error", [
+    ([[0x1000000]], 0, APCminimkii.InvalidRGBColour),
+    ([[(256, 0, 0)]], 0, APCminimkii.InvalidRGBColour),
+    ([[(0, 0)]], 0, APCminimkii.InvalidRGBColour),
+    ([[0], [0]], 7, APCminimkii.InvalidGridButton),
+])
+def test_rgb_frame_validates_before_sending(connect, frame, x, error):  # user-006
+    mk2, emulator, _ = connect(APCMinimkiiEmulator())
+    mk2.wait_ready(1)
+    with pytest.raises(error):
+        mk2.gridbuttons.set_rgb_frame(frame, x)
+    assert emulator.received == 1
@@ -0,0 +1,62 @@
+import pytest
+
+from akai_pro_py.loopback import APCMiniEmulator
+from akai_pro_py.scheduler import OutputScheduler
+
+
+def test_reset_then_set_led_in_order(connect):  # user-003
+    apc, emulator, _ = connect(APCMiniEmulator())
+    apc.wait_ready(1)
+    reset = apc.reset()
+    apc.gridbuttons.set_led(0, 0, "red")  # Queued behind the reset
+    assert reset.result(2) == 90
+    assert apc.wait_output(2)
+    assert emulator.leds[APCMiniEmulator.Device.GridMapping[0][0]] == (3, 0)
+    assert emulator.received == 1 + 90 + 1  # Device Enquiry, reset, set_led
+
+
+def test_batch_fails_with_first_write_error():  # user-003
+    written = []
+
+    def write(message):
+        if message == b"b":
+            raise OSError("Device was unplugged")
+        written.append(message)
+    scheduler = OutputScheduler(write, rate=None)
+    with pytest.raises(OSError):
+        scheduler.send_many([b"a", b"b", b"c"]).result(1)
+    assert written == [b"a", b"c"]
+    assert scheduler.send(b"d").result(1) == 1
+
+
+def test_close_cancels_queued_batches():  # user-003
+    scheduler = OutputScheduler(lambda message: None, rate=10)
+    batch = scheduler.send_many([b"x"] * 5)
+    scheduler.close()
+    assert batch.cancelled()
+    assert scheduler.pending == 0
+
+
+def test_coalesce_output_sends_latest_colour(connect):  # user-005
+    apc, emulator, _ = connect(APCMiniEmulator(), output_rate=20, coalesce_output=True)
+    apc.wait_ready(1)
+    for update in range(10):
+        apc.gridbuttons.set_led(0, 0, ("red", "green")[update & 1])
+    apc.gridbuttons.set_led(1, 0, "yellow")  # Other LEDs are not merged
+    assert apc.wait_output(2)
+    assert apc.output.coalesced >= 8
+    assert emulator.received == 1 + 10 + 1 - apc.output.coalesced
+    assert emulator.leds[APCMiniEmulator.Device.GridMapping[0][0]] == (1, 0)
+    assert emulator.leds[APCMiniEmulator.Device.GridMapping[1][0]] == (5, 0)
+
+
+def test_superseded_message_is_skipped():  # user-005
+    written = []
+    scheduler = OutputScheduler(written.append, rate=None, wake=lambda: None)
+    scheduler.send(b"a", key=1)
+    scheduler.send(b"b", key=2)
+    scheduler.send(b"c", key=1)
+    while scheduler.poll() is not None:
+        pass
+    assert written == [b"b", b"c"]
+    assert scheduler.coalesced == 1
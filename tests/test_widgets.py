@@ -0,0 +1,27 @@
+import pytest
+
+from akai_pro_py import APCmini, APCminimkii
+from akai_pro_py.loopback import APCMiniEmulator, APCMinimkiiEmulator
+
+
+def test_meter_lights_column(connect):  # user-009
+    apc, emulator, _ = connect(APCMiniEmulator(), output_rate=None)
+    apc.wait_ready(1)
+    meter = apc.meter([2])
+    meter.update(64)
+    column = APCmini.APCMini.GridMapping[2]
+    assert [emulator.leds.get(note, (0, 0))[0] for note in column] == [1, 1, 1, 1, 0, 0, 0, 0]
+    sent = emulator.received
+    meter.update(64)  # Nothing changed
+    assert emulator.received == sent
+
+
+def test_meter_needs_columns(connect):  # user-009
+    apc, _, _ = connect(APCMiniEmulator())
+    with pytest.raises(APCmini.InvalidGridButton):
+        apc.meter([])
+    with pytest.raises(APCmini.InvalidGridButton):
+        apc.meter([8])
+    mk2, _, _ = connect(APCMinimkiiEmulator())
+    with pytest.raises(APCminimkii.InvalidGridButton):
+        mk2.meter([])